@@ -1,23 +1,69 @@
 #!/usr/bin/env python3
 
-import cv2
-import pytesseract
+import time
+_import_started = time.perf_counter()
+
 import re
 from datetime import datetime
 import threading
-import queue
-import time
-from Arm_Lib import Arm_Device
-import tkinter as tk
-from tkinter import Label
-from PIL import Image, ImageTk
+import argparse
+import json
+import signal
+import socket
+import socketserver
+import sys
+from sortLog import SortLog
+from uiEvents import EventBus
+from startup import Subsystem
+from cameraConfig import CameraConfig
+from armKinematics import POSES
+import startup
+import metrics
+
+# The heavy subsystems (arm, OpenCV, camera, Tesseract or the digit CNN, Tk) are imported and
+# initialised on first use, or warmed up in parallel when the sorter starts.
+# Run with --profile-startup to see the import and init time of each.
+def _init_arm(Arm_Lib):
+    """
+    Initializes the robotic arm (DOFBOT).
+    """
+    device = Arm_Lib.Arm_Device()
+    time.sleep(0.1)  # Allow the arm to initialize properly
+    return device
 
-# Initialize the robotic arm (DOFBOT)
-Arm = Arm_Device()
-time.sleep(0.1)  # Allow the arm to initialize properly
+def _open_camera():
+    """
+    Opens the camera, raising RuntimeError if it is not available.
+    """
+    vision.get()
+    from cameraConfig import open_camera
+    cap = open_camera(camera_config)
+    if not cap.isOpened():
+        cap.release()
+        raise RuntimeError("Cannot open camera")
+    return cap
 
-# Path to installed tesseract (to be used in windows)
-# pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+def _init_ocr(pytesseract, _):
+    """
+    Prepares Tesseract, running the binary once so the first frame does not pay for it.
+    """
+    # Path to installed tesseract (to be used in windows)
+    # pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+    pytesseract.get_tesseract_version()
+    return pytesseract
+
+def _init_digits(digitRecognizer):
+    """
+    Loads the CNN digit recogniser used instead of Tesseract when ocr_engine is 'cnn'.
+    """
+    return digitRecognizer.DigitRecognizer(digit_model_path)
+
+arm = Subsystem("arm", ["Arm_Lib"], _init_arm)
+vision = Subsystem("vision", ["cv2", "numpy", "cameraConfig", "framePool", "frameContext", "deskew", "presence", "ocrCache", "codeReader", "pickLocator"])
+camera = Subsystem("camera", [], _open_camera, close=lambda cap: cap.release())
+ocr = Subsystem("ocr", ["pytesseract", "PIL.Image"], _init_ocr)
+digits = Subsystem("digits", ["digitRecognizer"], _init_digits)
+gui = Subsystem("gui", ["tkinter", "PIL.ImageTk", "preview"])
 
 # Arm movement functions
 def arm_clamp_block(enable):
@@ -26,10 +72,35 @@ def arm_clamp_block(enable):
     Args:
         enable (int): 1 to clamp, 0 to release.
     """
-    position = 100 if enable else 10
-    Arm.Arm_serial_servo_write(6, position, 400)
+    position = gripper_closed if enable else gripper_open
+    arm.get().Arm_serial_servo_write(6, position, 400)
     time.sleep(0.5)
 
+def grasp_held():
+    """
+    Checks whether the closed clamp holds an object: the jaws stop on an object
+    short of the commanded angle, but reach it when they close on nothing.
+    Returns:
+        bool: True if an object is held, False for an empty grasp, or None
+        if the servo position could not be read.
+    """
+    angle = arm.get().Arm_serial_servo_read(6)
+    if angle is None:
+        return None
+    return angle < gripper_closed - grasp_tolerance
+
+def park_arm():
+    """
+    Opens the clamp and moves the arm to p_rest, if the arm has been initialised.
+    Returns:
+        bool: True if the arm was parked.
+    """
+    if not arm.ready() or arm.error is not None:
+        return False
+    arm_clamp_block(0)
+    arm_move(p_rest, 1000)
+    return True
+
 def arm_move(positions, s_time=500):
     """
     Moves the robotic arm to specified positions.
@@ -37,6 +108,7 @@ def arm_move(positions, s_time=500):
         positions (list): List of positions for the arm's servos.
         s_time (int): Duration of the movement in milliseconds.
     """
+    device = arm.get()
     for i, pos in enumerate(positions):
         servo_id = i + 1
         # Adjust timing for specific servos if necessary
@@ -45,44 +117,126 @@ def arm_move(positions, s_time=500):
             int(3 * s_time / 4) if servo_id == 1 else
             int(s_time)
         )
-        Arm.Arm_serial_servo_write(servo_id, pos, adjusted_time)
+        device.Arm_serial_servo_write(servo_id, pos, adjusted_time)
         time.sleep(0.01)
     time.sleep(s_time / 1000)
 
-# Predefined arm positions
-p_front = [90, 75, 0, 30, 90]
-p_right = [0, 75, 0, 30, 90]
-p_right_top = [0, 75, 0, 60, 90]
-p_left_top = [180, 75, 0, 60, 90]
-p_left = [180, 75, 0, 30, 90]
-p_top = [90, 80, 50, 50, 90]
-p_rest = [90, 90, 0, 5, 90]
+# Predefined arm positions (the shared pose table in armKinematics.py)
+p_front = POSES["front"]
+p_right = POSES["right"]
+p_right_top = POSES["right_top"]
+p_left_top = POSES["left_top"]
+p_left = POSES["left"]
+p_top = POSES["top"]
+p_rest = POSES["rest"]
+
+# Clamp (servo 6) open and closed angles; a closed clamp reading more than
+# grasp_tolerance degrees short of gripper_closed is holding an object. An empty
+# grasp is retried up to pick_attempts times in all.
+gripper_open = 10
+gripper_closed = 100
+grasp_tolerance = 8
+pick_attempts = 3
+
+# Camera capture settings: fixed size and format, and a one frame driver buffer
+# so OCR always sees a fresh frame (run cameraConfig.py to probe what works)
+camera_config = CameraConfig(index=0, width=640, height=480, fps=30, fourcc="MJPG", buffer_size=1, backend="v4l2")
+
+# Shared memory frame slots between capture and processing (0 queues plain arrays);
+# enough for a full frame queue plus the frames being written and processed
+frame_pool_slots = 12
+
+# Read the expiry date from GS1 QR/barcodes (AI 17) before falling back to OCR
+read_codes = True
+
+# Text recognition engine: 'tesseract', or 'cnn' for the batched digit classifier
+# in digitRecognizer.py (the Learning Curve digit model exported with modelRuntime.py)
+ocr_engine = "tesseract"
+digit_model_path = "digits.tflite"
+
+# OCR results remembered per date-region hash, so repeat units of a SKU skip
+# Tesseract (0 disables the cache); kept in ocr_cache_path across restarts
+ocr_cache_size = 256
+ocr_cache_path = "ocr_cache.json"
+
+# Region of the camera frame (x0, y0, x1, y1 fractions) covering the pick area at p_front
+pick_zone = (0.25, 0.25, 0.75, 0.75)
+
+# Grasp each product where the camera sees it (outline in the pick zone mapped to
+# the table through arm_calibration_path, written by pickLocator.py calibrate)
+# instead of at p_front; without a calibration file the arm picks at p_front
+vision_pick = True
+arm_calibration_path = "arm_calibration.json"
+
+# Capture interval while the pick zone is empty (low-power idle) and during an OCR burst
+idle_capture_interval = 0.5
+burst_capture_interval = 0.1
+
+# Local port the Prometheus-text metrics are served on (http://127.0.0.1:9108/metrics)
+metrics_port = 9108
 
-# Last processed date to prevent redundant processing
-last_processed_date = None
+# How often the Tk thread drains the UI event bus
+ui_drain_interval_ms = 100
 
-# Queue lock to ensure thread-safe operations
-queue_lock = threading.Lock()
+# Local port the headless sorter accepts start/stop/status/quit commands on
+control_port = 9109
 
-def move_object(target, processing_event, producer_allowed_event):
+# Frames (and OCR results) allowed to wait between pipeline stages before the
+# stage in front waits for them, keeping OCR on fresh frames
+pipeline_queue_size = 2
+
+# Seconds without a frame to read after which the OCR cache is saved (it is also saved on close)
+idle_save_timeout = 30
+
+# Longest wait on shutdown or restart for the items being read or sorted to finish
+# before the pipeline is cancelled (an arm move in progress is always finished)
+shutdown_drain_timeout = 15
+
+# Seconds send_command waits for a reply: stop and restart answer only once an arm
+# move in progress (up to pick_attempts grasps) and, for restart, the drain are done
+command_timeout = 5
+slow_command_timeout = shutdown_drain_timeout + 45
+
+def move_object(target, pick=None):
     """
     Moves an object to the specified target location (left or right).
+    The clamp position is read back after closing, and an empty grasp is
+    retried up to pick_attempts times before giving up.
     Args:
         target (str): 'left' or 'right'.
-        processing_event (threading.Event): Event to control processing flow.
-        producer_allowed_event (threading.Event): Event to control frame capturing.
+        pick (tuple): (approach, grasp) joint targets at the product's position
+            from PickLocator.pick_pose(), or None to pick at p_front.
+    Returns:
+        bool: True if the object was picked and placed.
     """
-    processing_event.clear()
-    producer_allowed_event.clear()
     try:
         if target not in ['left', 'right']:
             print("Invalid target! Use 'left' or 'right'.")
-            return
+            return False
 
         # Pick up the object
-        arm_clamp_block(0)  # Release to prepare for pickup
-        arm_move(p_front, 1000)
-        arm_clamp_block(1)  # Clamp the object
+        for attempt in range(1, pick_attempts + 1):
+            arm_clamp_block(0)  # Release to prepare for pickup
+            if pick is None:
+                arm_move(p_front, 1000)
+                arm_clamp_block(1)  # Clamp the object
+                held = grasp_held()
+            else:
+                approach, grasp = pick
+                arm_move(approach, 1000)  # Above the product, then straight down onto it
+                arm_move(grasp, 500)
+                arm_clamp_block(1)  # Clamp the object
+                held = grasp_held()
+                arm_move(approach, 500)  # Lift clear before swinging round
+            if held is not False:  # Unreadable servos are trusted, as before the check
+                break
+            metrics.inc("grasp_failures")
+            print(f"Nothing in the clamp (attempt {attempt} of {pick_attempts})")
+        else:
+            print("Pick failed, leaving the product in place")
+            arm_clamp_block(0)
+            arm_move(p_rest, 1000)
+            return False
         arm_move(p_top, 1000)  # Lift the object
 
         # Move to the target
@@ -98,130 +252,718 @@ def move_object(target, processing_event, producer_allowed_event):
         # Return to the rest position
         arm_move(p_top, 1000)
         arm_move(p_rest, 1000)
+        return True
     except Exception as e:
         print(f"Error during arm movement: {e}")
-    finally:
-        producer_allowed_event.set()
-        processing_event.set()
+        return False
 
-def preprocess_image(frame):
+def preprocess_image(frame, context=None):
     """
     Converts a frame to grayscale and applies binary thresholding.
     Args:
         frame: Image frame to preprocess.
+        context (FrameContext): Optional context whose buffers are reused
+            instead of allocating new arrays for every frame.
     Returns:
         Processed binary image.
     """
+    if context is not None:
+        return context.preprocess(frame)
+    cv2 = vision.get()
     gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
     _, binary = cv2.threshold(gray, 128, 255, cv2.THRESH_BINARY)
     return binary
 
-def extract_expiry_date(image_path):
+def ocr_subsystem():
+    """
+    Returns the subsystem of the configured text recognition engine.
+    """
+    return digits if ocr_engine == "cnn" else ocr
+
+def extract_expiry_date(image_path, details=None, image=None):
     """
     Extracts expiry date from an image using OCR.
     Args:
         image_path (str): Path to the image file.
+        details (dict): Optional dict filled with the raw OCR 'text', and the
+            'confidence' (0-100) and 'boxes' (left, top, width, height) of the
+            words making up the date.
+        image: Optional binary image already in memory; the CNN engine reads it
+            directly instead of loading image_path.
     Returns:
         str: Extracted expiry date in DD/MM/YYYY format or None if not found.
     """
-    image = Image.open(image_path)
-    text = pytesseract.image_to_string(image)
+    if ocr_engine == "cnn":
+        if image is None:
+            image = vision.get().imread(image_path, 0)
+        data = digits.get().image_to_data(image)
+    else:
+        pytesseract = ocr.get()
+        from PIL import Image  # Already loaded by the OCR subsystem
+        data = pytesseract.image_to_data(Image.open(image_path), output_type=pytesseract.Output.DICT)
+    # Rebuild the text line by line from the word boxes
+    lines = {}
+    for i, word in enumerate(data["text"]):
+        if word.strip():
+            key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+            lines.setdefault(key, []).append(word)
+    text = "\n".join(" ".join(words) for words in lines.values())
     print("Extracted Text:\n", text)
+    if details is not None:
+        details["text"] = text
+        details["confidence"] = None
+        details["boxes"] = []
     pattern = r'\b\d{2}[./]\d{2}[./]\d{4}\b'
     match = re.search(pattern, text)
     if match:
         expiry_date = match.group(0)
         print("Expiry Date Found:", expiry_date)
+        if details is not None:
+            date_words = [i for i, word in enumerate(data["text"]) if word.strip() and word.strip() in expiry_date]
+            confidences = [float(data["conf"][i]) for i in date_words if float(data["conf"][i]) >= 0]
+            details["confidence"] = sum(confidences) / len(confidences) if confidences else None
+            details["boxes"] = [(data["left"][i], data["top"][i], data["width"][i], data["height"][i]) for i in date_words]
         return expiry_date
     else:
         print("Expiry date not found in the text")
         return None
 
-def process_frames(frame_queue_container, processing_event, producer_allowed_event, expired_count, valid_count):
+class FrameReader:
     """
-    Processes frames from the queue to detect expiry dates and take actions.
-    Args:
-        frame_queue_container (list): Container holding the frame queue.
-        processing_event (threading.Event): Event to control processing flow.
-        producer_allowed_event (threading.Event): Event to control frame capturing.
-        expired_count (tk.IntVar): Counter for expired products.
-        valid_count (tk.IntVar): Counter for valid products.
-    """
-    global last_processed_date
-    while True:
-        processing_event.wait()
-        with queue_lock:
-            current_queue = frame_queue_container[0]
-
-        if not current_queue.empty():
-            frame = current_queue.get()
-            image_path = "image.jpg"
-            processed_frame = preprocess_image(frame)
-            cv2.imwrite(image_path, processed_frame)
-            expiry_date = extract_expiry_date(image_path)
-            if expiry_date:
-                try:
+    Reads the expiry date off the frames of settled items: the read stage of
+    the pipeline, run on its OCR thread.
+    GS1 codes in the pick zone are decoded first (if read_codes is set) and
+    deskewing and OCR only run when no code carries an expiry date. The
+    skew/perspective and the pick position are worked out once per item.
+    """
+    def __init__(self, frame_pool=None, ocr_cache=None, preview_size=None):
+        """
+        Args:
+            frame_pool (FramePool): Pool the frame handles refer to, if frames are
+                passed through shared memory rather than as arrays.
+            ocr_cache (OcrCache): Optional cache of earlier OCR results; a label whose
+                date region matches a cached one skips Tesseract.
+            preview_size (tuple): (width, height) of the copy of each read frame kept
+                for the GUI preview, or None for no copy.
+        """
+        from frameContext import FrameContext
+        from deskew import Deskewer
+        from codeReader import CodeReader
+        from pickLocator import PickLocator
+        self.frame_pool = frame_pool
+        self.ocr_cache = ocr_cache
+        self.preview_size = preview_size
+        self.frame_context = FrameContext()  # Buffers are sized on the first frame
+        self.code_reader = CodeReader(roi=pick_zone) if read_codes else None
+        self.pick_locator = PickLocator(arm_calibration_path) if vision_pick else None
+        if self.pick_locator is not None and not self.pick_locator.calibrated:
+            print(f"No camera to arm calibration in {arm_calibration_path}, picking at p_front")
+            self.pick_locator = None
+        if self.pick_locator is not None:
+            # Products land in the pick zone, so its cells are looked up in one batch up front
+            self.pick_locator.precompute(pick_zone, (camera_config.width, camera_config.height))
+        self.deskewer = Deskewer()
+        self.item_id = None  # Presence ID of the item the deskew transform and pick belong to
+        self.pick = None
+        self.located = False
+
+    def read(self, item_id, item):
+        """
+        Reads one frame, releasing its frame pool slot.
+        Args:
+            item_id (int): Presence ID of the item in the frame.
+            item: The frame, or its frame pool handle.
+        Returns:
+            dict: 'item', 'date' (text), 'expiry' (datetime), 'decision' ('no_date',
+            'invalid_date', or None when the date still has to be judged), 'boxes'
+            (date polygons in frame coordinates), 'details' (OCR 'text' and
+            'confidence'), 'pick', 'preview' (downscaled copy of the frame, or None),
+            'shape' (of the frame), 'latency' and 'time'; or None if the frame was
+            recycled before it could be read.
+        """
+        from ocrCache import date_region
+        from pickLocator import product_rect
+        frame = self.frame_pool.view(item) if self.frame_pool is not None else item
+        if frame is None:
+            return None  # The slot was recycled before we got to it
+        if item_id != self.item_id:
+            # A new item needs its own transform and pick position
+            self.item_id = item_id
+            self.deskewer.reset()
+            self.pick = None
+            self.located = False
+        image_path = "image.jpg"
+        latency = {}
+        details = {}
+        expiry_date_obj = None
+        decision = "no_date"
+        shape = frame.shape
+        preview = None
+
+        try:
+            if self.preview_size is not None:
+                cv2 = vision.get()
+                preview = cv2.resize(frame, self.preview_size, interpolation=cv2.INTER_AREA)
+            with metrics.stage("preprocess", latency):
+                processed_frame = preprocess_image(frame, self.frame_context)
+        finally:
+            # The frame context holds its own copy now, so the slot can be reused
+            if self.frame_pool is not None:
+                self.frame_pool.release(item)
+        code = cached = None
+        if self.code_reader is not None:
+            with metrics.stage("code", latency):
+                code = self.code_reader.expiry(self.frame_context.gray)
+        if code is not None:
+            code_date, content, corners = code
+            expiry_date = code_date.strftime("%d/%m/%Y")
+            details = {"text": content, "confidence": None, "boxes": []}
+            boxes = [corners]
+            metrics.inc("code_reads")
+        else:
+            with metrics.stage("deskew", latency):
+                processed_frame = self.deskewer.rectify(processed_frame)
+            if self.ocr_cache is not None:
+                with metrics.stage("ocr_cache", latency):
+                    cached = self.ocr_cache.lookup(processed_frame)
+            if cached is not None:
+                expiry_date = cached["date"]
+                details = {"text": cached["text"], "confidence": cached["confidence"], "boxes": [tuple(cached["region"])]}
+            else:
+                if ocr_engine != "cnn":  # Tesseract reads the image from disk
+                    with metrics.stage("imwrite", latency):
+                        vision.get().imwrite(image_path, processed_frame)
+                with metrics.stage("ocr", latency):
+                    expiry_date = extract_expiry_date(image_path, details, processed_frame)
+            # Map the date boxes back through the deskew transform for the preview
+            boxes = [self.deskewer.to_source([(x, y), (x + w, y), (x + w, y + h), (x, y + h)])
+                     for x, y, w, h in details.get("boxes", ())]
+        metrics.inc("frames_processed")
+        if expiry_date:
+            try:
+                with metrics.stage("parse", latency):
                     formatted_date = expiry_date.replace('.', '/')
                     expiry_date_obj = datetime.strptime(formatted_date, "%d/%m/%Y")
-                    today = datetime.today()
-                    if last_processed_date is None or last_processed_date != expiry_date_obj:
-                        last_processed_date = expiry_date_obj
-                        if expiry_date_obj < today:
-                            target = "left"
-                            print("The product has expired!")
-                            expired_count.set(expired_count.get() + 1)
-                        else:
-                            target = "right"
-                            print("The product is valid.")
-                            valid_count.set(valid_count.get() + 1)
-
-                        producer_allowed_event.clear()
-                        processing_event.clear()
-                        with queue_lock:
-                            frame_queue_container[0] = queue.Queue(maxsize=10)
-                        move_object(target, processing_event, producer_allowed_event)
-                except ValueError:
-                    print("Invalid date format. Please check the extracted date.")
-
-def capture_frames(cap, frame_queue_container, producer_allowed_event):
-    """
-    Continuously captures frames from the camera and adds them to the queue.
-    Args:
-        cap: OpenCV VideoCapture object.
-        frame_queue_container (list): Container holding the frame queue.
-        producer_allowed_event (threading.Event): Event to control frame capturing.
+                if code is None and cached is None and self.ocr_cache is not None and details["boxes"]:
+                    # Only dates that parsed are worth remembering
+                    region = date_region(details["boxes"], processed_frame.shape)
+                    self.ocr_cache.store(processed_frame, region, expiry_date, details["text"], details["confidence"])
+                decision = None
+            except ValueError:
+                decision = "invalid_date"
+                print("Invalid date format. Please check the extracted date.")
+        else:
+            metrics.inc("ocr_misses")
+
+        if decision is None and self.pick_locator is not None and not self.located:
+            # Located from the first frame with a date, while it is still in the frame context
+            self.located = True
+            with metrics.stage("locate", latency):
+                rect = product_rect(self.frame_context.gray, pick_zone, boxes)
+                self.pick = self.pick_locator.pick_pose(rect) if rect is not None else None
+            if self.pick is None:
+                print("Product not located within reach, picking at p_front")
+        return {"item": item_id, "date": expiry_date, "expiry": expiry_date_obj, "decision": decision,
+                "boxes": boxes, "details": details, "pick": self.pick, "preview": preview, "shape": shape, "latency": latency, "time": time.monotonic()}
+
+class SorterService:
+    """
+    Runs the sorting pipeline (see orchestrator.Pipeline), independent of any front-end:
+    capture -> gate (presence) -> read (FrameReader) -> decide -> actuate (move_object).
+    It also manages the sorter's lifecycle: start, pause/resume, drain, stop
+    and restart the pipeline, and close() to release everything in order.
     """
-    while True:
-        producer_allowed_event.wait()
-        ret, frame = cap.read()
+    def __init__(self, bus, sort_log=None, preview_size=None):
+        """
+        Args:
+            bus (EventBus): Receives a 'result' event per OCR attempt with the date
+                'boxes' (polygons in frame coordinates), 'date', 'decision' and 'time',
+                and a 'pick_failed' event with the 'decision' when the arm could not pick the item up.
+            sort_log (SortLog): Optional log every OCR attempt and decision is recorded in.
+            preview_size (tuple): (width, height) of the frames kept for a preview in
+                preview_frame and preview_result, or None to keep none.
+        """
+        from framePool import FramePool
+        from ocrCache import OcrCache
+        from presence import PresenceDetector
+        from orchestrator import Pipeline
+        self.cap = None  # Opened on start, released by close()
+        self.bus = bus
+        self.sort_log = sort_log
+        self.counts = {"expired": 0, "valid": 0}
+        self.results = bus.subscribe()  # Feeds the counters reported by status()
+        # Frames go through shared memory slots, sized for the configured capture
+        self.frame_pool = FramePool(frame_pool_slots, (camera_config.height, camera_config.width, 3)) if frame_pool_slots else None
+        self.ocr_cache = OcrCache(ocr_cache_size, path=ocr_cache_path) if ocr_cache_size else None
+        self.presence = PresenceDetector(roi=pick_zone)
+        self.reader = None  # Created on the first start, it loads the pick calibration
+        self.decided_item = None  # Presence ID of the last item a decision was made for
+        # Downscaled copies for the GUI preview, replaced (never modified) by the pipeline threads:
+        # (frame, full frame shape) of the latest gated frame, and the latest 'result' event
+        # with the 'frame' it was read from and its 'shape'
+        self.preview_size = preview_size
+        self.preview_frame = None
+        self.preview_result = None
+        self.pipeline = Pipeline(self._capture, self._gate, self._read, self._decide, self._actuate,
+                                 discard=self._discard, resumed=self.presence.expect_new_item, idle=self._idle,
+                                 queue_size=pipeline_queue_size, retry_interval=burst_capture_interval,
+                                 idle_timeout=idle_save_timeout)
+
+    @property
+    def running(self):
+        return self.pipeline.running()
+
+    def start(self):
+        """
+        Starts the pipeline, opening the camera if needed.
+        """
+        if self.cap is None:
+            try:
+                self.cap = camera.get()
+            except RuntimeError as e:
+                print(e)
+                return
+        if self.reader is None:
+            self.reader = FrameReader(self.frame_pool, self.ocr_cache, self.preview_size)
+        self.pipeline.start()
+
+    def stop(self):
+        """
+        Stops the pipeline, letting an arm move in progress finish.
+        """
+        if self.running:
+            self.pipeline.stop()
+            # The item that settles after a restart is a new one, even if it looks like the last
+            self.presence.expect_new_item()
+
+    def pause(self):
+        """
+        Stops capturing; an item already being read or sorted is finished.
+        """
+        self.pipeline.pause()
+
+    def resume(self):
+        """
+        Resumes capturing after pause() or drain().
+        """
+        self.pipeline.resume()
+
+    def drain(self, timeout=shutdown_drain_timeout):
+        """
+        Pauses capturing and waits for the items in flight to be read and sorted.
+        Returns:
+            bool: True once drained, False if the timeout expired first.
+        """
+        drained = self.pipeline.drain(timeout)
+        if not drained:
+            print(f"Items still in flight after {timeout}s")
+        return drained
+
+    def restart(self, timeout=shutdown_drain_timeout):
+        """
+        Drains and stops the pipeline, then starts it again with empty queues.
+        """
+        self.drain(timeout)
+        self.stop()
+        self.start()
+
+    def _capture(self):
+        """
+        Capture stage: reads a camera frame, straight into a frame pool slot if there is a pool.
+        Returns:
+            The frame or its slot handle, or None if every slot is still waiting for the reader.
+        """
+        if self.frame_pool is None:
+            with metrics.stage("capture"):
+                ret, frame = self.cap.read()
+            if not ret:
+                raise OSError("Failed to grab frame")
+            return frame
+        slot = self.frame_pool.acquire()
+        if slot is None:
+            metrics.inc("frames_dropped")
+            return None
+        with metrics.stage("capture"):
+            buffer = self.frame_pool.buffer(slot)
+            ret, frame = self.cap.read(buffer)
+            if ret and frame.shape != buffer.shape:
+                # The camera ignored the configured size, scale into the slot
+                vision.get().resize(frame, (buffer.shape[1], buffer.shape[0]), dst=buffer)
+            elif ret and frame is not buffer:
+                buffer[...] = frame
         if not ret:
-            print("Failed to grab frame")
-            break
+            self.frame_pool.abandon(slot)
+            raise OSError("Failed to grab frame")
+        return self.frame_pool.publish(slot)
+
+    def _gate(self, item):
+        """
+        Gate stage: only frames of an item settled in the pick zone go on to OCR;
+        otherwise the camera is polled at the slower idle rate.
+        Returns:
+            tuple: (presence ID of the item, or None to drop the frame; seconds until the next capture).
+        """
+        from presence import EMPTY, SETTLED
+        frame = self.frame_pool.view(item) if self.frame_pool is not None else item
+        with metrics.stage("presence"):
+            state = self.presence.update(frame)
+        if self.preview_size is not None:
+            cv2 = vision.get()
+            self.preview_frame = (cv2.resize(frame, self.preview_size, interpolation=cv2.INTER_AREA), frame.shape)
+        if state != SETTLED:
+            # Poll slowly while the zone is empty, faster while an item is arriving
+            return None, idle_capture_interval if state == EMPTY else burst_capture_interval
+        return self.presence.item, burst_capture_interval
+
+    def _discard(self, item):
+        if self.frame_pool is not None:
+            self.frame_pool.release(item)
+
+    def _read(self, item_id, item):
+        return self.reader.read(item_id, item)
+
+    def _idle(self):
+        if self.ocr_cache is not None:
+            self.ocr_cache.save()  # Keeps what was learned if the sorter is killed rather than closed
+
+    def _decide(self, result):
+        """
+        Decide stage: posts the result and judges the date. One decision is made
+        per item (presence ID), so consecutive items with the same date are each
+        sorted while further frames of a sorted item are not.
+        Returns:
+            tuple: (target, result) for the arm, or None if nothing is to be moved.
+        """
+        if result is None:
+            return None
+        decision = result["decision"]
+        target = None
+        if decision is None:
+            decision = "duplicate"
+            if result["item"] != self.decided_item:
+                self.decided_item = result["item"]
+                if result["expiry"] < datetime.today():
+                    target = "left"
+                    decision = "expired"
+                    print("The product has expired!")
+                else:
+                    target = "right"
+                    decision = "valid"
+                    print("The product is valid.")
+        # Published before moving so the decision shows while the arm works
+        event = {"type": "result", "boxes": result["boxes"], "date": result["date"], "decision": decision, "time": result["time"]}
+        self.bus.post(event)
+        if result["preview"] is not None:
+            self.preview_result = dict(event, frame=result["preview"], shape=result["shape"])
+        result["decision"] = decision
+        if target is None:
+            self._record(result)
+            return None
+        return target, result
 
-        with queue_lock:
-            current_queue = frame_queue_container[0]
-            if current_queue.full():
-                try:
-                    current_queue.get_nowait()
-                except queue.Empty:
-                    pass
-            current_queue.put(frame)
-        time.sleep(0.1)
+    def _actuate(self, action):
+        """
+        Actuate stage: sorts the item with the arm.
+        """
+        target, result = action
+        with metrics.stage("move", result["latency"]):
+            placed = move_object(target, result["pick"])
+        if placed:
+            metrics.inc("items_sorted")
+        else:
+            # Take the item back off the counters, which counted it when the decision was posted
+            self.bus.post({"type": "pick_failed", "decision": result["decision"], "time": time.monotonic()})
+            result["decision"] = "pick_failed"
+            metrics.inc("pick_failures")
+        self._record(result)
+
+    def _record(self, result):
+        if self.sort_log is not None:
+            details = result["details"]
+            self.sort_log.record(details.get("text"), result["expiry"], result["decision"], details.get("confidence"), result["latency"])
+
+    def status(self):
+        """
+        Returns:
+            dict: Whether the sorter is running and paused, and the product counters.
+        """
+        count_decisions(self.results, self.counts)
+        return {"running": self.running, "paused": self.pipeline.paused, "expired": self.counts["expired"], "valid": self.counts["valid"]}
 
-def main():
+    def close(self, timeout=shutdown_drain_timeout):
+        """
+        Shuts the sorter down in phases, timing each one: drain (stop capturing
+        and finish the items in flight), stop (cancel the stages and join their
+        threads), park (arm to p_rest), camera and ocr (release the camera and
+        the OCR engine), ocr_cache (save it), frame_pool (free the shared memory)
+        and sort_log (flush it). The service cannot be started again afterwards.
+        Args:
+            timeout (float): Longest wait in the drain phase.
+        Returns:
+            dict: Seconds per phase, also recorded as shutdown_<phase> stage metrics.
+        """
+        timings = {}
+        def phase(name):
+            return metrics.stage(f"shutdown_{name}", timings)
+
+        with phase("drain"):
+            self.drain(timeout)
+        with phase("stop"):
+            self.stop()
+        with phase("park"):
+            park_arm()
+        with phase("camera"):
+            camera.close()
+            self.cap = None
+        with phase("ocr"):
+            ocr.close()
+            digits.close()
+        if self.ocr_cache is not None:
+            with phase("ocr_cache"):
+                self.ocr_cache.save()
+            print(f"OCR cache: {self.ocr_cache.stats()}")
+        if self.frame_pool is not None:
+            with phase("frame_pool"):
+                self.frame_pool.unlink()
+        if self.sort_log is not None:
+            with phase("sort_log"):
+                self.sort_log.close()
+        print("Shutdown: " + ", ".join(f"{name[len('shutdown_'):]} {seconds:.3f}s" for name, seconds in timings.items())
+              + f", total {sum(timings.values()):.3f}s")
+        return timings
+
+def count_decisions(subscription, counts):
+    """
+    Drains a bus subscription and adds the sorted items to the counters.
+    Args:
+        subscription (Subscription): Subscription to the pipeline event bus.
+        counts (dict): Counters keyed by decision ('expired', 'valid').
+    """
+    batch = subscription.drain()
+    while batch:
+        for event in batch:
+            if event["type"] == "result" and event["decision"] in counts:
+                counts[event["decision"]] += 1
+            elif event["type"] == "pick_failed" and event["decision"] in counts:
+                counts[event["decision"]] -= 1
+        batch = subscription.drain()
+
+def serve_control(service, shutdown_event, port=control_port):
+    """
+    Accepts line based commands (start, stop, restart, pause, resume, status, quit) on a local TCP socket.
+    Args:
+        service (SorterService): Service the commands are applied to.
+        shutdown_event (threading.Event): Set when a 'quit' command is received.
+        port (int): Local port to listen on.
+    Returns:
+        socketserver.ThreadingTCPServer: The running server.
+    """
+    class ControlHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                command = line.decode().strip().lower()
+                if command == "start":
+                    service.start()
+                    reply = "ok"
+                elif command == "stop":
+                    service.stop()
+                    reply = "ok"
+                elif command == "restart":
+                    service.restart()
+                    reply = "ok"
+                elif command == "pause":
+                    service.pause()
+                    reply = "ok"
+                elif command == "resume":
+                    service.resume()
+                    reply = "ok"
+                elif command == "status":
+                    reply = json.dumps(service.status())
+                elif command == "quit":
+                    shutdown_event.set()
+                    reply = "ok"
+                else:
+                    reply = f"error unknown command {command!r}"
+                self.wfile.write((reply + "\n").encode())
+
+    socketserver.ThreadingTCPServer.allow_reuse_address = True
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", port), ControlHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def send_command(command, port=control_port, timeout=None):
+    """
+    Sends one command to a running headless sorter.
+    Args:
+        command (str): start, stop, restart, pause, resume, status or quit.
+        port (int): Control port of the sorter.
+        timeout (float): Seconds to wait for the reply, or None for slow_command_timeout
+            on stop and restart and command_timeout otherwise.
+    Returns:
+        str: The sorter's reply.
+    """
+    if timeout is None:
+        timeout = slow_command_timeout if command in ("stop", "restart") else command_timeout
+    with socket.create_connection(("127.0.0.1", port), timeout=timeout) as connection:
+        connection.sendall((command + "\n").encode())
+        return connection.makefile().readline().strip()
+
+def run_headless(autostart=True):
+    """
+    Runs capture, OCR and the arm as a service without Tkinter.
+    Controlled through the local control socket (see send_command) or signals:
+    SIGUSR1 starts, SIGUSR2 stops and SIGINT/SIGTERM shut the service down.
+    Args:
+        autostart (bool): Start sorting immediately instead of waiting for 'start'.
+    """
+    startup.warm_up([vision, camera, ocr_subsystem(), arm])
+    try:
+        camera.get()
+    except RuntimeError as e:
+        print(e)
+        return
+
+    sort_log = SortLog()
+    metrics.serve(metrics_port)
+    service = SorterService(EventBus(), sort_log)
+    shutdown_event = threading.Event()
+    control_server = serve_control(service, shutdown_event)
+
+    signal.signal(signal.SIGINT, lambda signum, frame: shutdown_event.set())
+    signal.signal(signal.SIGTERM, lambda signum, frame: shutdown_event.set())
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: service.start())
+        signal.signal(signal.SIGUSR2, lambda signum, frame: service.stop())
+
+    if autostart:
+        service.start()
+    print(f"ExpirioBot running headless, control port {control_port}")
+    # Wake up regularly so signals are handled promptly on the main thread,
+    # and drain the bus so the counters stay current between status requests
+    while not shutdown_event.wait(1):
+        service.status()
+
+    control_server.shutdown()  # No more commands while the sorter shuts down
+    service.close()
+    print("Final counts:", service.status())
+
+def run_in_background(root, target, buttons, done=None):
+    """
+    Runs a slow call (e.g. a stop, which waits for an arm move in progress) on a
+    worker thread so the Tk loop keeps running. The buttons stay disabled until
+    it returns, so a Start pressed meanwhile is not lost to the stop.
+    Args:
+        root (tk.Tk): Window whose loop polls for the call to finish.
+        target (callable): The call.
+        buttons (list): Buttons disabled while it runs.
+        done (callable): Called with target's return value on the Tk thread.
+    """
+    outcome = []
+    worker = threading.Thread(target=lambda: outcome.append(target()), daemon=True)
+    for button in buttons:
+        button.configure(state="disabled")
+    worker.start()
+
+    def wait():
+        if worker.is_alive():
+            root.after(ui_drain_interval_ms, wait)
+            return
+        for button in buttons:
+            button.configure(state="normal")
+        if done is not None and outcome:
+            done(outcome[0])
+    wait()
+
+def run_client(port=control_port):
+    """
+    Tk control panel for a sorter running in headless mode.
+    Shows the counters and sends Start/Stop over the control socket.
+    """
+    tk = gui.get()
+    root = tk.Tk()
+    root.title("ExpirioBot Control Panel")
+    root.configure(bg="#2e2e2e")
+
+    expired_count = tk.IntVar(value=0)
+    valid_count = tk.IntVar(value=0)
+    state_text = tk.StringVar(value="Connecting...")
+
+    tk.Label(root, textvariable=state_text, font=("Comfortaa", 12), bg="#2e2e2e", fg="white").pack(pady=5)
+    tk.Label(root, textvariable=expired_count, font=("Comfortaa", 14), fg="red", bg="#2e2e2e").pack()
+    tk.Label(root, text="Expired Products", font=("Comfortaa", 12), bg="#2e2e2e", fg="white").pack()
+    tk.Label(root, textvariable=valid_count, font=("Comfortaa", 14), fg="green", bg="#2e2e2e").pack()
+    tk.Label(root, text="Valid Products", font=("Comfortaa", 12), bg="#2e2e2e", fg="white").pack()
+
+    def command(name):
+        try:
+            return send_command(name, port)
+        except OSError as e:
+            state_text.set(f"Sorter not reachable: {e}")
+            return None
+
+    def poll_status():
+        """
+        Refreshes the counters from the sorter every half second.
+        """
+        reply = command("status")
+        if reply:
+            status = json.loads(reply)
+            expired_count.set(status["expired"])
+            valid_count.set(status["valid"])
+            if not status["running"]:
+                state_text.set("Stopped")
+            else:
+                state_text.set("Paused" if status["paused"] else "Running")
+        root.after(500, poll_status)
+
+    def stop_sorter():
+        """
+        Sends stop off the Tk thread: the sorter replies once an arm move in progress has finished.
+        """
+        def send():
+            try:
+                send_command("stop", port)
+                return None
+            except OSError as e:
+                return e
+
+        def report(error):
+            if error is not None:
+                state_text.set(f"Sorter not reachable: {error}")
+        run_in_background(root, send, [start_button, stop_button], report)
+
+    button_frame = tk.Frame(root, bg="#2e2e2e")
+    button_frame.pack(pady=10)
+    start_button = tk.Button(button_frame, text="Start", command=lambda: command("start"), bg="#4caf50", fg="white", font=("Comfortaa", 12))
+    start_button.grid(row=0, column=0, padx=10)
+    stop_button = tk.Button(button_frame, text="Stop", command=stop_sorter, bg="#f44336", fg="white", font=("Comfortaa", 12))
+    stop_button.grid(row=0, column=1, padx=10)
+
+    poll_status()
+    root.mainloop()
+
+def main(preview_fps=10, preview_size=(320, 240)):
     """
     Main function to initialize the system and GUI.
+    Args:
+        preview_fps (float): Refresh rate of the video preview.
+        preview_size (tuple): (width, height) of the video preview.
     """
-    cap = cv2.VideoCapture(0)
-    if not cap.isOpened():
-        print("Cannot open camera")
+    startup.warm_up([vision, camera, ocr_subsystem(), arm, gui])
+    try:
+        camera.get()  # Opened here so a missing camera is reported before the window opens
+    except RuntimeError as e:
+        print(e)
         return
 
+    tk = gui.get()
+    from preview import PreviewRenderer
     root = tk.Tk()
     root.title("ExpirioBot Control Panel")
     root.configure(bg="#2e2e2e")
 
-    video_label = Label(root, bg="#2e2e2e")
+    video_label = tk.Label(root, bg="#2e2e2e")
     video_label.pack()
 
     expired_count = tk.IntVar(value=0)
@@ -235,68 +977,115 @@ def main():
     valid_label.pack()
     tk.Label(root, text="Valid Products", font=("Comfortaa", 12), bg="#2e2e2e", fg="white").pack()
 
-    frame_queue_container = [queue.Queue(maxsize=10)]
-    processing_event = threading.Event()
-    producer_allowed_event = threading.Event()
-
-    producer_thread = None
-    consumer_thread = None
+    sort_log = SortLog()
+    metrics.serve(metrics_port)
+    preview = PreviewRenderer(video_label, preview_fps, preview_size)
+    bus = EventBus()
+    events = bus.subscribe()
+    service = SorterService(bus, sort_log, preview_size)
 
-    def start_program():
+    def drain_events():
         """
-        Starts the frame capture and processing threads.
+        Applies the pipeline events to the widgets on the Tk thread, in batches.
         """
-        nonlocal producer_thread, consumer_thread
-        processing_event.set()
-        producer_allowed_event.set()
-
-        if producer_thread is None or not producer_thread.is_alive():
-            producer_thread = threading.Thread(target=capture_frames, args=(cap, frame_queue_container, producer_allowed_event))
-            producer_thread.daemon = True
-            producer_thread.start()
-
-        if consumer_thread is None or not consumer_thread.is_alive():
-            consumer_thread = threading.Thread(target=process_frames, args=(frame_queue_container, processing_event, producer_allowed_event, expired_count, valid_count))
-            consumer_thread.daemon = True
-            consumer_thread.start()
-
-    def stop_program():
-        """
-        Stops the frame capture and processing threads.
-        """
-        producer_allowed_event.clear()
-        processing_event.clear()
+        for event in events.drain():
+            if event["type"] == "result":
+                if event["decision"] == "expired":
+                    expired_count.set(expired_count.get() + 1)
+                elif event["decision"] == "valid":
+                    valid_count.set(valid_count.get() + 1)
+            elif event["type"] == "pick_failed":
+                count = expired_count if event["decision"] == "expired" else valid_count
+                count.set(count.get() - 1)
+        root.after(ui_drain_interval_ms, drain_events)
 
     def update_frame():
         """
-        Updates the GUI with the latest video frame from the camera.
+        Updates the GUI with the latest frame the pipeline captured (the camera
+        is only read by the pipeline) and the latest result.
         """
-        ret, frame = cap.read()
-        if ret:
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            img = Image.fromarray(frame)
-            imgtk = ImageTk.PhotoImage(image=img)
-            video_label.imgtk = imgtk
-            video_label.configure(image=imgtk)
-        root.after(10, update_frame)
+        preview.set_result(service.preview_result)
+        latest = service.preview_frame
+        if latest is not None:
+            preview.render(*latest)
+        root.after(preview.interval_ms, update_frame)
 
     # Buttons for controlling the program
     button_frame = tk.Frame(root, bg="#2e2e2e")
     button_frame.pack(pady=10)
 
-    start_button = tk.Button(button_frame, text="Start", command=start_program, bg="#4caf50", fg="white", font=("Comfortaa", 12))
+    start_button = tk.Button(button_frame, text="Start", command=service.start, bg="#4caf50", fg="white", font=("Comfortaa", 12))
     start_button.grid(row=0, column=0, padx=10)
 
-    stop_button = tk.Button(button_frame, text="Stop", command=stop_program, bg="#f44336", fg="white", font=("Comfortaa", 12))
+    def stop_sorter():
+        """
+        Stops the sorter off the Tk thread, as it waits for an arm move in progress to finish.
+        """
+        run_in_background(root, service.stop, [start_button, stop_button])
+
+    stop_button = tk.Button(button_frame, text="Stop", command=stop_sorter, bg="#f44336", fg="white", font=("Comfortaa", 12))
     stop_button.grid(row=0, column=1, padx=10)
 
     update_frame()
+    drain_events()
     root.mainloop()
-    cap.release()
+    service.close()
+
+def profile_startup(headless=False):
+    """
+    Loads every subsystem in parallel and prints how long each one took to
+    import and initialise, and how long until the first camera frame.
+    Args:
+        headless (bool): Leave out the GUI subsystem.
+    """
+    subsystems = [vision, camera, ocr_subsystem(), arm] + ([] if headless else [gui])
+    start = time.perf_counter()
+    startup.warm_up(subsystems)
+    for subsystem in subsystems:
+        try:
+            subsystem.get()
+        except Exception:
+            pass  # Reported as FAILED below
+    ready_seconds = time.perf_counter() - start
+
+    print(f"{'module':<10} {module_import_seconds:>8.3f}s (ExpirioBot.py itself)")
+    print(startup.report(subsystems, ready_seconds))
+    if camera.error is None:
+        camera.value.read()
+        print(f"{'1st frame':<10} {time.perf_counter() - start:>28.3f}s")
+    for subsystem in subsystems:
+        subsystem.close()
+
+module_import_seconds = time.perf_counter() - _import_started
 
 if __name__ == "__main__":
-    try:
-        main()
-    finally:
-        del Arm
-        print("Program Ended")
+    parser = argparse.ArgumentParser(description="ExpirioBot expiry date sorter")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--headless", action="store_true", help="run as a service without the GUI")
+    mode.add_argument("--client", action="store_true", help="open the control panel for a headless sorter")
+    mode.add_argument("--command", choices=["start", "stop", "restart", "pause", "resume", "status", "quit"], help="send one command to a headless sorter")
+    parser.add_argument("--no-autostart", action="store_true", help="with --headless, wait for a start command")
+    parser.add_argument("--preview-fps", type=float, default=10, help="GUI preview refresh rate")
+    parser.add_argument("--preview-size", default="320x240", help="GUI preview resolution as WIDTHxHEIGHT")
+    parser.add_argument("--profile-startup", action="store_true", help="print the import and init time of each subsystem and exit")
+    args = parser.parse_args()
+
+    if args.profile_startup:
+        profile_startup(headless=args.headless)
+    elif args.command:
+        try:
+            print(send_command(args.command))
+        except OSError as e:
+            print(f"Sorter not reachable: {e}")
+            sys.exit(1)
+    elif args.client:
+        run_client()
+    else:
+        try:
+            if args.headless:
+                run_headless(autostart=not args.no_autostart)
+            else:
+                main(args.preview_fps, tuple(int(v) for v in args.preview_size.lower().split("x")))
+        finally:
+            arm.close()
+            print("Program Ended")
@@ -1,10 +1,16 @@
+import os
+import sys
 import cv2
 import numpy as np
-from tensorflow.keras.models import load_model
 
-# Initialize the model
+# The lean model runtime lives at the top of the repository
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from modelRuntime import load_model
+
+# Initialize the model (myModel.h5 exported to int8 with:
+#   python3 modelRuntime.py export myModel.h5 myModel.tflite <calibration crops folder>)
 def initializePredictionModel():
-    model = load_model('myModel.h5')
+    model = load_model('myModel.tflite')  # No TensorFlow import needed
     return model
 
 # Preprocess the image (grayscale, blur, threshold)
@@ -14,6 +20,21 @@ def preProcess(img):
     imgThreshold = cv2.adaptiveThreshold(imgBlur, 255, 1, 1, 11, 2)  # Apply adaptive threshold
     return imgThreshold
 
+# Get predictions for all the digit ROIs of a frame in one model call
+def getPredictions(rois, model):
+    if not rois:
+        return np.empty(0, dtype=int), np.empty(0)
+
+    # Resize and convert each ROI, then stack them into one (N, 28, 28, 1) tensor
+    batch = np.stack([cv2.cvtColor(cv2.resize(roi, (28, 28)), cv2.COLOR_BGR2GRAY) for roi in rois])
+    batch = batch.reshape(-1, 28, 28, 1).astype(np.float32) / 255.0  # Normalize the whole batch at once
+
+    # One inference for the whole frame
+    predictions = model.predict(batch)
+    classIndices = np.argmax(predictions, axis=1)  # Index of the highest predicted value per ROI
+    probabilityValues = np.max(predictions, axis=1)  # Highest probability per ROI
+    return classIndices, probabilityValues
+
 # Get predictions for the digits in the image
 def getPrediction(img, model):
     # Ensure the image is resized to 28x28
@@ -53,20 +74,22 @@ def main():
         # Find contours in the thresholded image
         contours, _ = cv2.findContours(imgThreshold, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
         
+        # Collect the ROIs of all candidate digits first
+        rois = []
         for cnt in contours:
             area = cv2.contourArea(cnt)
             if area > 100:  # Filter out small contours that are unlikely to be digits
                 x, y, w, h = cv2.boundingRect(cnt)  # Get the bounding box of the contour
                 
                 # Extract the region of interest (ROI) for digit recognition
-                roi = frame[y:y+h, x:x+w]
-                
-                # Get the predicted digit from the model
-                digit = getPrediction(roi, model)
-                
-                if digit is not None:
-                    # Print the recognized digit to the terminal
-                    print(f'Recognized digit: {digit}')
+                rois.append(frame[y:y+h, x:x+w])
+        
+        # Then classify them all in one batch instead of one model call per contour
+        classIndices, probabilityValues = getPredictions(rois, model)
+        for digit, probability in zip(classIndices, probabilityValues):
+            if probability > 0.8:  # Only consider predictions with high confidence
+                # Print the recognized digit to the terminal
+                print(f'Recognized digit: {digit}')
         
         # Display the thresholded image (for debugging)
         cv2.imshow('Thresholded Image', imgThreshold)
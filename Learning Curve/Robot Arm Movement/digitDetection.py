@@ -1,10 +1,16 @@
+import os
+import sys
 import cv2
 import numpy as np
-from keras.models import load_model
-import tensorflow as tf
 
-# Load the pre-trained YOLO model
-model = load_model('weights.h5', compile=False)
+# The lean model runtime lives at the top of the repository
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from modelRuntime import load_model
+from yoloDetector import decode_predictions
+
+# Load the pre-trained YOLO model (weights.h5 exported to int8 with:
+#   python3 modelRuntime.py export weights.h5 weights.tflite <calibration frames folder> 416 416 3)
+model = load_model('weights.tflite')  # No TensorFlow import needed
 
 # Function to preprocess the frame for YOLO
 def preprocess_frame(frame, input_size=(416, 416)):
@@ -22,37 +28,13 @@ def draw_boxes(frame, boxes, confidences, class_ids, classes):
         cv2.putText(frame, label, (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
 
 # Function to post-process YOLO output
-def postprocess_predictions(predictions, frame_shape, confidence_threshold=0.5):
-    # Get the height and width of the frame
-    h, w = frame_shape[:2]
-    
-    # List to store bounding boxes, confidences, and class IDs
-    boxes, confidences, class_ids = [], [], []
-    
-    # Assuming YOLO output shape is (batch_size, grid_size, grid_size, num_anchors * (5 + num_classes))
-    # Process predictions for each image in the batch
-    for pred in predictions[0]:  # Assuming batch_size=1
-        for i in range(len(pred)):
-            # Extract the class scores (after objectness score)
-            scores = pred[i, 5:]  # Class scores are after the 5th element (x, y, w, h, objectness)
-            confidence = pred[i, 4]  # Objectness score
-            
-            # If the confidence score is above the threshold
-            if confidence > confidence_threshold:
-                class_id = np.argmax(scores)  # Get class with max score
-                confidence *= scores[class_id]  # Multiply by class confidence
-                
-                # Calculate bounding box coordinates (normalize to original image size)
-                box = pred[i, :4] * np.array([w, h, w, h])  # Scale to original image size
-                bx, by, bw, bh = box.astype("int")
-                x = int(bx - (bw / 2))
-                y = int(by - (bh / 2))
-                
-                boxes.append([x, y, int(bw), int(bh)])
-                confidences.append(float(confidence))  # Ensure confidence is a float
-                class_ids.append(class_id)
-
-    return boxes, confidences, class_ids
+def postprocess_predictions(predictions, frame_shape, confidence_threshold=0.5, nms_threshold=0.4):
+    # YOLO output shape is (batch_size, grid_size, grid_size, num_anchors * (5 + num_classes));
+    # the whole grid is thresholded, scaled and de-duplicated (NMS) in one vectorised pass
+    boxes, confidences, class_ids = decode_predictions(
+        [predictions[0]], frame_shape, confidence_threshold, nms_threshold,
+        objectness=True, num_classes=len(classes))
+    return boxes.tolist(), confidences.tolist(), class_ids.tolist()
 
 # Load the class names (digits 0-9)
 classes = [str(i) for i in range(10)]
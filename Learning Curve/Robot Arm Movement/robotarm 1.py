@@ -2,6 +2,8 @@
 # coding=utf-8
 
 import time
+import os
+import sys
 from Arm_Lib import Arm_Device  # Yahboom Dofbot SDK
 import cv2
 import numpy as np
@@ -9,62 +11,26 @@ import rospy
 from sensor_msgs.msg import Image
 from cv_bridge import CvBridge
 
+# The YOLO detector and arm poses shared with the sorter live at the top of the repository
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from yoloDetector import YOLODetector  # Output layers and input buffer set up once
+from armKinematics import POSES
+
 # Initialize DOFBOT
 Arm = Arm_Device()
 time.sleep(0.1)
 
-# YOLO Detector for object classification
-class YOLODetector:
-    """
-    A class to handle YOLO-based object detection.
-    """
-    def __init__(self, config_path, weights_path, names_path):
-        self.net = cv2.dnn.readNetFromDarknet(config_path, weights_path)
-        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
-        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
-        with open(names_path, 'r') as f:
-            self.labels = f.read().strip().split('\n')
-
-    def detect(self, frame):
-        """
-        Perform object detection on a given frame.
-        """
-        blob = cv2.dnn.blobFromImage(frame, 1 / 255.0, (416, 416), swapRB=True, crop=False)
-        self.net.setInput(blob)
-        layer_names = self.net.getLayerNames()
-        output_layers = [layer_names[i[0] - 1] for i in self.net.getUnconnectedOutLayers()]
-        outputs = self.net.forward(output_layers)
-
-        h, w = frame.shape[:2]
-        detections = []
-        for output in outputs:
-            for detection in output:
-                scores = detection[5:]
-                class_id = np.argmax(scores)
-                confidence = scores[class_id]
-                if confidence > 0.5:  # Threshold for confidence
-                    box = detection[0:4] * np.array([w, h, w, h])
-                    (center_x, center_y, width, height) = box.astype("int")
-                    x = int(center_x - (width / 2))
-                    y = int(center_y - (height / 2))
-                    detections.append({
-                        "label": self.labels[class_id],
-                        "confidence": float(confidence),
-                        "x": x, "y": y, "width": int(width), "height": int(height)
-                    })
-        return detections
-
 # Control DOFBOT arm movement and actions
 class DofbotController:
     def __init__(self, arm):
         self.arm = arm
 
-        # Predefined positions
-        self.p_front = [90, 60, 50, 50, 90]  # Front position
-        self.p_right = [0, 60, 50, 50, 90]   # Right position
-        self.p_left = [180, 60, 50, 50, 90]  # Left position
-        self.p_top = [90, 80, 50, 50, 90]    # Top position
-        self.p_rest = [90, 130, 0, 0, 90]    # Rest position
+        # Predefined positions, from the pose table shared with ExpirioBot.py
+        self.p_front = POSES["mover_front"]  # Front position
+        self.p_right = POSES["mover_right"]  # Right position
+        self.p_left = POSES["mover_left"]    # Left position
+        self.p_top = POSES["top"]            # Top position
+        self.p_rest = POSES["mover_rest"]    # Rest position
 
     def arm_clamp(self, enable):
         """
@@ -129,7 +95,8 @@ def process_camera_and_move():
     bridge = CvBridge()
     cap = cv2.VideoCapture(0)  # Replace with your camera index if not 0
 
-    yolo = YOLODetector("cfg/yolov4.cfg", "weights/yolov4.weights", "data/coco.names")
+    # 320 is faster on the CPU, 608 finds smaller objects; time them with yoloDetector.py
+    yolo = YOLODetector("cfg/yolov4.cfg", "weights/yolov4.weights", "data/coco.names", input_size=416)
     controller = DofbotController(Arm)
 
     while not rospy.is_shutdown():
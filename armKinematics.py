@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+
+import json
+import math
+import os
+import sys
+import time
+
+# DOFBOT geometry in millimetres: base plate to shoulder axis, shoulder to
+# elbow, elbow to wrist, and wrist axis to the point between the gripper jaws.
+# Measure the gripper length on the arm if the picks land short or long.
+BASE_HEIGHT = 107.5
+UPPER_ARM = 82.85
+FOREARM = 82.85
+GRIPPER = 175.0
+
+# Servo angle range of joints 1-5 in degrees
+SERVO_MIN = 0
+SERVO_MAX = 180
+
+# Gripper pitches tried by inverse(), in degrees from straight up: straight
+# down first (best for picking from above), tilting forward when out of reach
+PITCHES = tuple(range(180, 85, -5))
+
+# Named arm poses (servo angles of joints 1-5) shared by the sorter and the
+# arm scripts; tune them here for your setup
+POSES = {
+    "front": [90, 75, 0, 30, 90],       # Pick position in front of the arm
+    "right": [0, 75, 0, 30, 90],        # Drop position on the right (valid products)
+    "right_top": [0, 75, 0, 60, 90],    # Above the right drop position
+    "left": [180, 75, 0, 30, 90],       # Drop position on the left (expired products)
+    "left_top": [180, 75, 0, 60, 90],   # Above the left drop position
+    "top": [90, 80, 50, 50, 90],        # Raised transition position
+    "rest": [90, 90, 0, 5, 90],         # Folded rest position
+    # Calibrated separately for the standalone mover scripts (objectMover.py,
+    # robotarm 1.py); they share "top" with the sorter
+    "mover_front": [90, 60, 50, 50, 90],
+    "mover_right": [0, 60, 50, 50, 90],
+    "mover_left": [180, 60, 50, 50, 90],
+    "mover_rest": [90, 130, 0, 0, 90],
+}
+
+# Precomputed inverse kinematics over the arm's vertical plane (reach from
+# the base axis, height), memory-mapped from GRID_PATH next to this file; the
+# base angle is the direction of the target, so the plane covers every yaw.
+# The bounds take in everything the links can reach.
+GRID_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reach_grid.npy")
+GRID_STEP = 2.0
+GRID_REACH = (0.0, 350.0)
+GRID_HEIGHT = (-250.0, 350.0)
+
+def forward(joints):
+    """
+    Position of the grip point for a set of servo angles.
+    The arm frame has x pointing forward (servo 1 at 90), y to the left
+    (servo 1 at 180) and z up from the base plate. Joints 2-4 are at 90 when
+    their link points straight on, and lower angles tilt them forward.
+    Args:
+        joints (list): Servo angles of joints 1-4 (a fifth, wrist roll, is ignored).
+    Returns:
+        tuple: (x, y, z) in millimetres and the gripper pitch in degrees from straight up.
+    """
+    yaw = math.radians(joints[0] - 90)
+    shoulder = math.radians(90 - joints[1])
+    elbow = shoulder + math.radians(90 - joints[2])
+    pitch = elbow + math.radians(90 - joints[3])
+    reach = UPPER_ARM * math.sin(shoulder) + FOREARM * math.sin(elbow) + GRIPPER * math.sin(pitch)
+    z = BASE_HEIGHT + UPPER_ARM * math.cos(shoulder) + FOREARM * math.cos(elbow) + GRIPPER * math.cos(pitch)
+    return reach * math.cos(yaw), reach * math.sin(yaw), z, math.degrees(pitch)
+
+def solve(x, y, z, pitch):
+    """
+    Closed-form inverse kinematics for one gripper pitch.
+    Args:
+        x, y, z (float): Grip point in the arm frame, millimetres.
+        pitch (float): Gripper angle in degrees from straight up (180 points down).
+    Returns:
+        list: Servo angles of joints 1-4, or None if the point is out of reach
+        at this pitch or needs a servo beyond its range.
+    """
+    yaw = math.degrees(math.atan2(y, x))
+    reach = math.hypot(x, y)
+    angle = math.radians(pitch)
+    # Wrist axis position in the arm's vertical plane, relative to the shoulder
+    wrist_reach = reach - GRIPPER * math.sin(angle)
+    wrist_height = z - BASE_HEIGHT - GRIPPER * math.cos(angle)
+    bend = (wrist_reach ** 2 + wrist_height ** 2 - UPPER_ARM ** 2 - FOREARM ** 2) / (2 * UPPER_ARM * FOREARM)
+    if abs(bend) > 1:
+        return None
+    elbow = math.acos(bend)
+    shoulder = math.atan2(wrist_reach, wrist_height) - math.atan2(FOREARM * math.sin(elbow), UPPER_ARM + FOREARM * math.cos(elbow))
+    wrist = angle - shoulder - elbow
+    joints = [90 + yaw, 90 - math.degrees(shoulder), 90 - math.degrees(elbow), 90 - math.degrees(wrist)]
+    # Half a degree of slack so poses at the end stops survive rounding
+    if not all(SERVO_MIN - 0.5 <= joint <= SERVO_MAX + 0.5 for joint in joints):
+        return None
+    return [min(max(joint, SERVO_MIN), SERVO_MAX) for joint in joints]
+
+def _solve_plane(reach, z, pitch):
+    """
+    solve() for whole arrays of (reach, height) points in the vertical plane.
+    Returns:
+        numpy.ndarray: ... x 3 servo angles of joints 2-4, NaN where out of reach or range.
+    """
+    import numpy as np
+    angle = math.radians(pitch)
+    wrist_reach = reach - GRIPPER * math.sin(angle)
+    wrist_height = z - BASE_HEIGHT - GRIPPER * math.cos(angle)
+    bend = (wrist_reach ** 2 + wrist_height ** 2 - UPPER_ARM ** 2 - FOREARM ** 2) / (2 * UPPER_ARM * FOREARM)
+    with np.errstate(invalid="ignore"):
+        elbow = np.arccos(bend)  # NaN beyond reach
+    shoulder = np.arctan2(wrist_reach, wrist_height) - np.arctan2(FOREARM * np.sin(elbow), UPPER_ARM + FOREARM * np.cos(elbow))
+    wrist = angle - shoulder - elbow
+    joints = np.stack([90 - np.degrees(shoulder), 90 - np.degrees(elbow), 90 - np.degrees(wrist)], axis=-1)
+    with np.errstate(invalid="ignore"):
+        valid = ((joints >= SERVO_MIN - 0.5) & (joints <= SERVO_MAX + 0.5)).all(axis=-1)
+    joints[~valid] = np.nan
+    return np.clip(joints, SERVO_MIN, SERVO_MAX)
+
+def _geometry():
+    """
+    What a reach grid depends on; a grid built for other values is rebuilt.
+    """
+    return {
+        "links": [BASE_HEIGHT, UPPER_ARM, FOREARM, GRIPPER], "servo_range": [SERVO_MIN, SERVO_MAX],
+        "pitches": list(PITCHES), "step": GRID_STEP, "reach": list(GRID_REACH), "height": list(GRID_HEIGHT),
+    }
+
+def build_grid(path=GRID_PATH):
+    """
+    Solves the inverse kinematics for every point of the vertical plane grid
+    (taking the first reachable pitch of PITCHES, like inverse()) and writes
+    it as a .npy file of reach x height x (joint 2, joint 3, joint 4, pitch),
+    NaN where unreachable, with the geometry it was built for next to it.
+    Args:
+        path (str): .npy file to write.
+    """
+    import numpy as np
+    reach = np.arange(GRID_REACH[0], GRID_REACH[1] + GRID_STEP / 2, GRID_STEP)
+    height = np.arange(GRID_HEIGHT[0], GRID_HEIGHT[1] + GRID_STEP / 2, GRID_STEP)
+    reach, height = np.meshgrid(reach, height, indexing="ij")
+    temporary = path + ".tmp.npy"
+    grid = np.lib.format.open_memmap(temporary, mode="w+", dtype=np.float32, shape=reach.shape + (4,))
+    grid[:] = np.nan
+    for pitch in PITCHES:
+        joints = _solve_plane(reach, height, pitch)
+        fill = np.isnan(grid[..., 0]) & ~np.isnan(joints[..., 0])
+        grid[fill, :3] = joints[fill]
+        grid[fill, 3] = pitch
+    grid.flush()
+    del grid
+    os.replace(temporary, path)
+    with open(os.path.splitext(path)[0] + ".json", "w") as f:
+        json.dump(_geometry(), f)
+
+class ReachGrid:
+    """
+    Inverse kinematics for many targets at once (e.g. precomputing a table of
+    pick positions), looked up in the precomputed grid instead of solved
+    point by point. A single point is solved as quickly by inverse(), so the
+    grid is only worth it for batches. The grid file is memory-mapped, so it
+    is paged in from disk as needed and shared between processes rather than
+    loaded into each. Joint angles are interpolated bilinearly between the
+    four surrounding grid points, which is exact to well under the servos'
+    1 degree steps.
+    """
+    def __init__(self, path=GRID_PATH):
+        """
+        Args:
+            path (str): Grid file, built (or rebuilt for a changed geometry) if needed.
+        """
+        import numpy as np
+        geometry = None
+        try:
+            with open(os.path.splitext(path)[0] + ".json") as f:
+                geometry = json.load(f)
+        except (OSError, ValueError):
+            pass
+        if geometry != _geometry() or not os.path.exists(path):
+            build_grid(path)
+        self.grid = np.load(path, mmap_mode="r")
+
+    def lookup_many(self, points):
+        """
+        Servo angles of joints 1-4 for many grip points, interpolated from the grid.
+        Between grid points solved at different pitches, or at the edge of
+        reach, the point is solved directly instead.
+        Args:
+            points: N x 3 (x, y, z) grip points in millimetres.
+        Returns:
+            numpy.ndarray: N x 4 servo angles of joints 1-4, NaN rows where out of reach.
+        """
+        import numpy as np
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        x, y, z = points.T
+        yaw = 90 + np.degrees(np.arctan2(y, x))
+        i = (np.hypot(x, y) - GRID_REACH[0]) / GRID_STEP
+        j = (z - GRID_HEIGHT[0]) / GRID_STEP
+        inside = (i >= 0) & (j >= 0) & (i < self.grid.shape[0] - 1) & (j < self.grid.shape[1] - 1) & \
+                 (yaw >= SERVO_MIN - 0.5) & (yaw <= SERVO_MAX + 0.5)
+        i0, j0 = np.where(inside, i, 0).astype(int), np.where(inside, j, 0).astype(int)
+        values = self.grid.view(np.ndarray)
+        a, b, c, d = values[i0, j0], values[i0, j0 + 1], values[i0 + 1, j0], values[i0 + 1, j0 + 1]
+        di, dj = (i - i0)[:, None], (j - j0)[:, None]
+        joints = np.empty((len(points), 4))
+        joints[:, 0] = np.clip(yaw, SERVO_MIN, SERVO_MAX)
+        joints[:, 1:] = (a[:, :3] * (1 - di) * (1 - dj) + b[:, :3] * (1 - di) * dj +
+                         c[:, :3] * di * (1 - dj) + d[:, :3] * di * dj)
+        same = inside & (a[:, 3] == b[:, 3]) & (a[:, 3] == c[:, 3]) & (a[:, 3] == d[:, 3])  # False for NaN
+        unreachable = np.isnan(a[:, 3]) & np.isnan(b[:, 3]) & np.isnan(c[:, 3]) & np.isnan(d[:, 3])
+        joints[~inside | unreachable] = np.nan
+        # Points between pitches or at the edge of reach are solved one by one
+        for row in np.flatnonzero(inside & ~same & ~unreachable):
+            found = _solve_first(*points[row])
+            joints[row] = found if found is not None else np.nan
+        return joints
+
+def _solve_first(x, y, z, pitches=PITCHES):
+    """
+    Unrounded servo angles of joints 1-4 at the first pitch that reaches the point, or None.
+    """
+    for pitch in pitches:
+        joints = solve(x, y, z, pitch)
+        if joints is not None:
+            return joints
+    return None
+
+def inverse(x, y, z, roll=90, pitches=PITCHES):
+    """
+    Servo angles that put the grip point at a position, pointing the gripper
+    as close to straight down as the arm allows there; each pitch is solved
+    in turn.
+    Args:
+        x, y, z (float): Grip point in the arm frame, millimetres.
+        roll (float): Wrist rotation (servo 5) in degrees.
+        pitches (tuple): Gripper pitches tried, in order of preference.
+    Returns:
+        list: Rounded servo angles of joints 1-5, or None if unreachable.
+    """
+    joints = _solve_first(x, y, z, pitches)
+    return None if joints is None else [int(round(joint)) for joint in joints] + [int(round(roll))]
+
+def benchmark(points=5000):
+    """
+    Times a batched grid look-up against solving each point with inverse(),
+    and checks how far the looked-up servo angles put the grip point from
+    the target.
+    """
+    import random
+    import numpy as np
+    random.seed(0)
+    targets = [(random.uniform(80, 300), random.uniform(-200, 200), random.uniform(0, 150)) for _ in range(points)]
+    start = time.perf_counter()
+    grid = ReachGrid()
+    print(f"grid ready in {time.perf_counter() - start:.2f} s ({grid.grid.nbytes / 1024:.0f} KiB mapped)")
+
+    start = time.perf_counter()
+    solved = [inverse(x, y, z) for x, y, z in targets]
+    solve_seconds = (time.perf_counter() - start) / points
+    start = time.perf_counter()
+    batch = grid.lookup_many(targets)
+    batch_seconds = (time.perf_counter() - start) / points
+
+    errors = [math.dist(forward(joints)[:3], target) for joints, target in zip(batch, targets) if not np.isnan(joints[0])]
+    differences = np.abs(np.round(batch) - np.array([p[:4] if p else [np.nan] * 4 for p in solved]))
+    print(f"solve: {solve_seconds * 1e6:.1f} us/point, grid batch: {batch_seconds * 1e6:.2f} us/point")
+    print(f"reachable {len(errors)}/{points}, grip point error {sum(errors) / len(errors):.2f} mm mean, "
+          f"{max(errors):.2f} mm max; largest servo difference to solving {np.nanmax(differences):.0f} deg")
+
+if __name__ == "__main__":
+    if len(sys.argv) == 2 and sys.argv[1] == "build":
+        build_grid()
+        print(f"Wrote {GRID_PATH}")
+    else:
+        benchmark()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+
+import sys
+import time
+
+# OpenCV capture backends selectable by name. cv2 is only imported when the
+# camera is opened, so a CameraConfig can be built without loading OpenCV.
+BACKENDS = {
+    "any": "CAP_ANY",
+    "v4l2": "CAP_V4L2",
+    "gstreamer": "CAP_GSTREAMER",
+    "dshow": "CAP_DSHOW",
+    "msmf": "CAP_MSMF",
+}
+
+class CameraConfig:
+    """
+    Capture settings applied when the camera is opened.
+    Any setting left as None keeps the driver default.
+    """
+    def __init__(self, index=0, width=640, height=480, fps=30, fourcc="MJPG", buffer_size=1,
+                 exposure=None, focus=None, backend="v4l2"):
+        """
+        Args:
+            index (int): Camera index.
+            width (int): Frame width in pixels.
+            height (int): Frame height in pixels.
+            fps (int): Requested frame rate.
+            fourcc (str): Pixel format, e.g. 'MJPG' or 'YUYV'.
+            buffer_size (int): Frames the driver may queue; 1 keeps frames fresh.
+            exposure (float): Locks exposure to this value (disables auto exposure).
+            focus (float): Locks focus to this value (disables autofocus).
+            backend (str): One of BACKENDS, e.g. 'v4l2' on the Pi.
+        """
+        self.index = index
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.fourcc = fourcc
+        self.buffer_size = buffer_size
+        self.exposure = exposure
+        self.focus = focus
+        self.backend = backend
+
+    def __repr__(self):
+        return (f"CameraConfig({self.width}x{self.height}@{self.fps} {self.fourcc}, "
+                f"buffer={self.buffer_size}, backend={self.backend})")
+
+def open_camera(config):
+    """
+    Opens and configures the camera.
+    Args:
+        config (CameraConfig): Settings to apply.
+    Returns:
+        cv2.VideoCapture: The opened capture (check isOpened()).
+    """
+    import cv2
+    cap = cv2.VideoCapture(config.index, getattr(cv2, BACKENDS.get(config.backend, "CAP_ANY")))
+    if not cap.isOpened() and config.backend != "any":
+        # Fall back to whatever backend OpenCV picks by default
+        cap = cv2.VideoCapture(config.index)
+    if not cap.isOpened():
+        return cap
+
+    # FOURCC has to be set before the size for the driver to pick a matching mode
+    if config.fourcc:
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*config.fourcc))
+    if config.width and config.height:
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, config.width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, config.height)
+    if config.fps:
+        cap.set(cv2.CAP_PROP_FPS, config.fps)
+    if config.buffer_size:
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, config.buffer_size)
+    if config.exposure is not None:
+        cap.set(cv2.CAP_PROP_AUTO_EXPOSURE, 1)  # V4L2 'manual' mode
+        cap.set(cv2.CAP_PROP_EXPOSURE, config.exposure)
+    if config.focus is not None:
+        cap.set(cv2.CAP_PROP_AUTOFOCUS, 0)
+        cap.set(cv2.CAP_PROP_FOCUS, config.focus)
+    return cap
+
+def describe(cap):
+    """
+    Reports the settings the driver actually accepted.
+    Args:
+        cap (cv2.VideoCapture): Opened capture.
+    Returns:
+        dict: Actual width, height, fps, fourcc, buffer size and backend.
+    """
+    import cv2
+    fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
+    return {
+        "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        "fps": cap.get(cv2.CAP_PROP_FPS),
+        "fourcc": "".join(chr((fourcc >> 8 * i) & 0xFF) for i in range(4)),
+        "buffer_size": int(cap.get(cv2.CAP_PROP_BUFFERSIZE)),
+        "backend": cap.getBackendName(),
+    }
+
+def probe(config, frames=60, process_time=0.1):
+    """
+    Measures the real frame rate and the capture-to-process latency of a setting.
+    The latency pass sleeps `process_time` between reads, like the OCR stage
+    does, so a deep driver buffer shows up as stale frames.
+    Args:
+        config (CameraConfig): Setting to measure.
+        frames (int): Frames read for each measurement.
+        process_time (float): Simulated processing time per frame (s).
+    Returns:
+        dict: Accepted settings plus measured fps and latency, or None if the camera did not open.
+    """
+    import cv2
+    cap = open_camera(config)
+    if not cap.isOpened():
+        return None
+    result = describe(cap)
+    for _ in range(5):
+        cap.read()  # Let exposure and the stream settle
+
+    start = time.perf_counter()
+    grabbed = sum(1 for _ in range(frames) if cap.read()[0])
+    result["measured_fps"] = grabbed / (time.perf_counter() - start)
+
+    # Frame age from the driver timestamp (CLOCK_MONOTONIC on V4L2), if it provides one
+    ages, waits = [], []
+    for _ in range(frames // 4):
+        time.sleep(process_time)
+        start = time.perf_counter()
+        ret, _ = cap.read()
+        waits.append(time.perf_counter() - start)
+        stamp = cap.get(cv2.CAP_PROP_POS_MSEC)
+        age = time.monotonic() * 1000 - stamp
+        if ret and stamp > 0 and 0 <= age < 5000:
+            ages.append(age)
+    result["latency_ms"] = sum(ages) / len(ages) if ages else None
+    # A read that returns instantly after a pause came from the buffer, i.e. a stale frame
+    result["stale_reads"] = sum(1 for wait in waits if wait < 0.002) / len(waits) if waits else None
+    cap.release()
+    return result
+
+def main():
+    """
+    Probes common settings and prints what each one delivers.
+    Usage: python3 cameraConfig.py [camera index]
+    """
+    index = int(sys.argv[1]) if len(sys.argv) > 1 else 0
+    settings = [
+        CameraConfig(index, None, None, None, None, None, backend="any"),  # Driver defaults
+        CameraConfig(index, 640, 480, 30, "MJPG", 1),
+        CameraConfig(index, 640, 480, 30, "YUYV", 1),
+        CameraConfig(index, 640, 480, 30, "MJPG", 4),
+        CameraConfig(index, 1280, 720, 30, "MJPG", 1),
+        CameraConfig(index, 320, 240, 30, "YUYV", 1),
+    ]
+    for config in settings:
+        result = probe(config)
+        if result is None:
+            print(f"{config}: camera did not open")
+            continue
+        latency = f"{result['latency_ms']:.0f} ms" if result["latency_ms"] is not None else "n/a"
+        print(f"{config}: got {result['width']}x{result['height']} {result['fourcc']} via {result['backend']}, "
+              f"buffer={result['buffer_size']}, {result['measured_fps']:.1f} fps, "
+              f"latency {latency}, stale reads {result['stale_reads']:.0%}")
+
+if __name__ == "__main__":
+    main()
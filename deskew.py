@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+
+import cv2
+import numpy as np
+
+class Deskewer:
+    """
+    Geometry correction applied to the binary image before OCR.
+    If the label outline is visible as a quadrilateral it is warped flat with
+    a perspective transform, otherwise the skew is estimated from the
+    orientation of the text lines and the image is rotated to horizontal.
+
+    The transform is estimated once and cached for the item in front of the
+    camera, call reset() when a new item arrives.
+    """
+    def __init__(self, max_angle=45, min_angle=0.5, min_label_area=0.2):
+        """
+        Args:
+            max_angle (float): Largest skew (degrees) that will be corrected.
+            min_angle (float): Skews smaller than this are left alone.
+            min_label_area (float): Fraction of the image a label outline must
+                cover before it is used for perspective rectification.
+        """
+        self.max_angle = max_angle
+        self.min_angle = min_angle
+        self.min_label_area = min_label_area
+        self.transform = None  # (kind, matrix, output size) for the current item
+        self.angle = None
+
+    def reset(self):
+        """
+        Drops the cached transform so it is re-estimated for the next item.
+        """
+        self.transform = None
+        self.angle = None
+
+    @staticmethod
+    def _order_corners(points):
+        """
+        Orders four corner points as top-left, top-right, bottom-right, bottom-left.
+        """
+        points = points.reshape(4, 2).astype(np.float32)
+        sums = points.sum(axis=1)
+        diffs = np.diff(points, axis=1).ravel()
+        return np.array([
+            points[np.argmin(sums)],
+            points[np.argmin(diffs)],
+            points[np.argmax(sums)],
+            points[np.argmax(diffs)],
+        ], dtype=np.float32)
+
+    def _label_transform(self, binary):
+        """
+        Finds the label outline and returns a perspective transform flattening it.
+        """
+        height, width = binary.shape[:2]
+        contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if not contours:
+            return None
+        outline = max(contours, key=cv2.contourArea)
+        area = cv2.contourArea(outline)
+        # A label filling the whole frame is just the background, not an outline
+        if area < self.min_label_area * height * width or area > 0.95 * height * width:
+            return None
+        approx = cv2.approxPolyDP(outline, 0.02 * cv2.arcLength(outline, True), True)
+        if len(approx) != 4:
+            return None
+
+        corners = self._order_corners(approx)
+        top_left, top_right, bottom_right, bottom_left = corners
+        out_width = int(max(np.linalg.norm(top_right - top_left), np.linalg.norm(bottom_right - bottom_left)))
+        out_height = int(max(np.linalg.norm(bottom_left - top_left), np.linalg.norm(bottom_right - top_right)))
+        target = np.array([[0, 0], [out_width - 1, 0], [out_width - 1, out_height - 1], [0, out_height - 1]], dtype=np.float32)
+        matrix = cv2.getPerspectiveTransform(corners, target)
+        return "perspective", matrix, (out_width, out_height)
+
+    def estimate_skew(self, binary):
+        """
+        Estimates the skew of the text lines in a binary image.
+        Args:
+            binary: Binary image with dark text on a light background.
+        Returns:
+            float: Skew in degrees (positive is clockwise), or None if no text lines were found.
+        """
+        # Join neighbouring characters into line blobs with a wide kernel
+        text = cv2.bitwise_not(binary)
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (15, 3))
+        lines = cv2.dilate(text, kernel)
+        contours, _ = cv2.findContours(lines, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        angles, weights = [], []
+        for contour in contours:
+            (_, _), (w, h), angle = cv2.minAreaRect(contour)
+            # Make w the long side so the angle is the direction of the line
+            if w < h:
+                w, h = h, w
+                angle += 90
+            if h == 0 or w < 2 * h or w < 20:
+                continue  # Not line shaped (noise, single glyphs, the border)
+            angle = (angle + 90) % 180 - 90
+            if abs(angle) <= self.max_angle:
+                angles.append(angle)
+                weights.append(w)
+
+        if not angles:
+            return None
+        # Weighted median so long lines dominate and stray blobs are ignored
+        order = np.argsort(angles)
+        cumulative = np.cumsum(np.asarray(weights)[order])
+        return float(np.asarray(angles)[order][np.searchsorted(cumulative, cumulative[-1] / 2)])
+
+    def _rotation_transform(self, binary):
+        """
+        Returns an affine transform rotating the text lines to horizontal.
+        """
+        angle = self.estimate_skew(binary)
+        if angle is None:
+            return None
+        self.angle = angle
+        height, width = binary.shape[:2]
+        if abs(angle) < self.min_angle:
+            return "identity", None, (width, height)
+
+        matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+        # Grow the output so the rotated corners are not cropped
+        cos, sin = abs(matrix[0, 0]), abs(matrix[0, 1])
+        out_width = int(height * sin + width * cos)
+        out_height = int(height * cos + width * sin)
+        matrix[0, 2] += out_width / 2 - width / 2
+        matrix[1, 2] += out_height / 2 - height / 2
+        return "rotation", matrix, (out_width, out_height)
+
+    def to_source(self, points):
+        """
+        Maps points from the rectified image back into the original frame.
+        Args:
+            points: Sequence of (x, y) points in rectified image coordinates.
+        Returns:
+            numpy.ndarray: Nx2 array of points in frame coordinates.
+        """
+        points = np.asarray(points, dtype=np.float32).reshape(-1, 1, 2)
+        if self.transform is not None:
+            kind, matrix, _ = self.transform
+            if kind == "perspective":
+                points = cv2.perspectiveTransform(points, np.linalg.inv(matrix))
+            elif kind == "rotation":
+                points = cv2.transform(points, cv2.invertAffineTransform(matrix))
+        return points.reshape(-1, 2)
+
+    def rectify(self, binary):
+        """
+        Warps a binary image so the label text is horizontal.
+        Args:
+            binary: Binary image from preprocess_image.
+        Returns:
+            The corrected image (or the input if no correction was needed).
+        """
+        if self.transform is None:
+            self.transform = self._label_transform(binary) or self._rotation_transform(binary)
+            if self.transform is None:
+                return binary  # Nothing to estimate from yet, try again next frame
+
+        kind, matrix, size = self.transform
+        if kind == "perspective":
+            return cv2.warpPerspective(binary, matrix, size, borderValue=255)
+        if kind == "rotation":
+            return cv2.warpAffine(binary, matrix, size, borderValue=255)
+        return binary
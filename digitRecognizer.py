@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+
+import re
+import sys
+import time
+import cv2
+import numpy as np
+
+# Side of the square digit images the classifier was trained on (MNIST style)
+DIGIT_SIZE = 28
+
+class DigitClassifier:
+    """
+    CPU inference of the 28x28 digit classifier from the Learning Curve
+    trials, exported with modelRuntime.py (int8 .tflite or .onnx) and run
+    without TensorFlow.
+    """
+    def __init__(self, model_path="digits.tflite", layout="nhwc"):
+        """
+        Args:
+            model_path (str): Exported model.
+            layout (str): Input layout, 'nhwc' for Keras exports or 'nchw'.
+        """
+        from modelRuntime import load_model
+        self.layout = layout
+        self.model = load_model(model_path)
+        self.batch = np.empty((0, DIGIT_SIZE, DIGIT_SIZE), np.float32)  # Grown to the largest batch seen
+
+    def predict(self, batch):
+        """
+        Runs one inference over a batch of digit images.
+        Args:
+            batch (numpy.ndarray): N x 28 x 28 float32 images, white digit on black, 0-1.
+        Returns:
+            numpy.ndarray: N x 10 class probabilities.
+        """
+        if self.layout == "nhwc":
+            batch = batch[:, :, :, None]
+        else:
+            batch = batch[:, None, :, :]
+        return self.model.predict(batch).reshape(len(batch), -1)
+
+    def classify(self, digits):
+        """
+        Classifies all the digit images of a frame in one inference.
+        The images are stacked into a reused float tensor and normalised in a
+        single vectorised operation instead of one by one.
+        Args:
+            digits: Sequence (or N x 28 x 28 array) of uint8 digit images, white on black.
+        Returns:
+            tuple: (classes, probabilities) arrays of length N.
+        """
+        count = len(digits)
+        if count == 0:
+            return np.empty(0, np.int64), np.empty(0, np.float32)
+        if count > len(self.batch):
+            self.batch = np.empty((count, DIGIT_SIZE, DIGIT_SIZE), np.float32)
+        batch = self.batch[:count]
+        np.multiply(np.asarray(digits, dtype=np.uint8), np.float32(1 / 255), out=batch)
+        probabilities = self.predict(batch)
+        return probabilities.argmax(axis=1), probabilities.max(axis=1)
+
+def digit_image(crop):
+    """
+    Turns a character crop (dark on white) into a classifier input the way
+    MNIST digits look: white on black, scaled into a 20x20 box and centred
+    in the 28x28 image.
+    """
+    height, width = crop.shape
+    scale = 20 / max(height, width)
+    size = (max(int(round(width * scale)), 1), max(int(round(height * scale)), 1))
+    digit = np.zeros((DIGIT_SIZE, DIGIT_SIZE), np.uint8)
+    x, y = (DIGIT_SIZE - size[0]) // 2, (DIGIT_SIZE - size[1]) // 2
+    digit[y:y + size[1], x:x + size[0]] = cv2.resize(255 - crop, size, interpolation=cv2.INTER_AREA)
+    return digit
+
+def _is_slash(ink):
+    """
+    Tells a '/' from a 1 or 7 by where the ink sits in a 3x3 grid: a slash
+    fills the bottom-left and top-right cells and leaves the other corners empty.
+    """
+    height, width = ink.shape
+    if width < height * 0.3:
+        return False  # Too narrow to lean, a 1
+    rows, columns = np.array_split(np.arange(height), 3), np.array_split(np.arange(width), 3)
+    cell = lambda r, c: ink[rows[r][0]:rows[r][-1] + 1, columns[c][0]:columns[c][-1] + 1].mean()
+    return min(cell(0, 2), cell(2, 0)) > 0.25 and max(cell(0, 0), cell(2, 2)) < 0.08
+
+class DigitRecognizer:
+    """
+    Reads the digits (and the '/' and '.' separators) of a binary label image.
+    Characters are segmented as connected components, all digit candidates of
+    the image are classified in one batched inference, and the result is
+    returned in the same word-box layout as pytesseract.image_to_data, so
+    extract_expiry_date can use either engine.
+    """
+    def __init__(self, model_path="digits.tflite", layout="nhwc", min_height=8, min_confidence=0.5):
+        """
+        Args:
+            model_path (str): Exported digit classifier.
+            layout (str): Input layout of the model, 'nhwc' or 'nchw'.
+            min_height (int): Smallest character height in pixels; smaller blobs are noise or dots.
+            min_confidence (float): Digits classified with less probability are read as '?'.
+        """
+        self.classifier = DigitClassifier(model_path, layout)
+        self.min_height = min_height
+        self.min_confidence = min_confidence
+
+    def segment(self, binary):
+        """
+        Finds the character boxes of a binary image.
+        Args:
+            binary: Image with dark text on a white background.
+        Returns:
+            list: Lines, each a list of (x, y, w, h) boxes ordered left to right.
+        """
+        count, _, stats, _ = cv2.connectedComponentsWithStats((binary < 128).view(np.uint8), connectivity=8)
+        boxes = [tuple(int(v) for v in stats[i, :4]) for i in range(1, count)
+                 if stats[i, cv2.CC_STAT_AREA] >= 4 and stats[i, cv2.CC_STAT_HEIGHT] < binary.shape[0] * 0.5]
+        characters = [box for box in boxes if box[3] >= self.min_height]
+        if not characters:
+            return []
+        height = float(np.median([h for _, _, _, h in characters]))
+        # Keep digit-sized characters and the dots between them, drop specks and large shapes
+        boxes = [box for box in boxes if box[3] <= height * 2 and (box[3] >= self.min_height or
+                 (box[3] >= height * 0.1 and box[2] <= height * 0.4))]
+
+        lines = []
+        for box in sorted(boxes, key=lambda box: box[1] + box[3]):
+            bottom = box[1] + box[3]
+            for line in lines:
+                if abs(line["bottom"] - bottom) < height * 0.5:
+                    line["boxes"].append(box)
+                    break
+            else:
+                lines.append({"bottom": bottom, "boxes": [box]})
+        return [sorted(line["boxes"]) for line in sorted(lines, key=lambda line: line["bottom"])]
+
+    def image_to_data(self, binary):
+        """
+        Recognises the characters of a binary image.
+        Args:
+            binary: Image with dark text on a white background.
+        Returns:
+            dict: pytesseract.Output.DICT style lists 'text', 'conf' (0-100), 'left',
+            'top', 'width', 'height', 'block_num', 'par_num' and 'line_num', one entry per word.
+        """
+        lines = self.segment(binary)
+        characters = []  # (line, box, symbol or None if it needs the classifier)
+        crops = []
+        word_gaps = {}  # Smallest gap between characters that separates two words, per line
+        for number, boxes in enumerate(lines, 1):
+            height = float(np.median([h for _, _, _, h in boxes]))
+            gaps = [x1 - (x0 + w0) for (x0, _, w0, _), (x1, _, _, _) in zip(boxes, boxes[1:])]
+            word_gaps[number] = max(2 * float(np.median(gaps)) if gaps else 0.0, 0.3 * height)
+            for x, y, w, h in boxes:
+                crop = binary[y:y + h, x:x + w]
+                if h < height * 0.4:
+                    characters.append((number, (x, y, w, h), "."))
+                elif _is_slash(crop < 128):
+                    characters.append((number, (x, y, w, h), "/"))
+                else:
+                    characters.append((number, (x, y, w, h), None))
+                    crops.append(digit_image(crop))
+
+        classes, scores = self.classifier.classify(crops)
+
+        words = []
+        digit = 0
+        for number, (x, y, w, h), symbol in characters:
+            confidence = 1.0
+            if symbol is None:
+                confidence = float(scores[digit])
+                symbol = str(classes[digit]) if confidence >= self.min_confidence else "?"
+                digit += 1
+            word = words[-1] if words else None
+            # A gap clearly wider than the spacing between letters starts a new word
+            if word is None or word["line"] != number or x - word["right"] > word_gaps[number]:
+                word = {"line": number, "text": "", "conf": 1.0, "left": x, "top": y, "right": x + w, "bottom": y + h}
+                words.append(word)
+            word["text"] += symbol
+            word["conf"] = min(word["conf"], confidence)
+            word["top"], word["bottom"] = min(word["top"], y), max(word["bottom"], y + h)
+            word["right"] = max(word["right"], x + w)
+
+        return {
+            "text": [word["text"] for word in words],
+            "conf": [round(word["conf"] * 100, 1) for word in words],
+            "left": [word["left"] for word in words],
+            "top": [word["top"] for word in words],
+            "width": [word["right"] - word["left"] for word in words],
+            "height": [word["bottom"] - word["top"] for word in words],
+            "block_num": [1] * len(words),
+            "par_num": [1] * len(words),
+            "line_num": [word["line"] for word in words],
+        }
+
+def _tesseract_read(binary):
+    """
+    Reads an image with Tesseract the way ExpirioBot does, for the benchmark.
+    """
+    import pytesseract
+    from PIL import Image
+    return pytesseract.image_to_string(Image.fromarray(binary))
+
+def benchmark(model_path, image_paths, repeats=5):
+    """
+    Compares the digit recogniser with Tesseract on preprocessed label images
+    (e.g. the image.jpg ExpirioBot writes before OCR).
+    Args:
+        model_path (str): Exported digit classifier.
+        image_paths (list): Images to read.
+        repeats (int): Reads per image and engine for the timing.
+    """
+    recognizer = DigitRecognizer(model_path)
+    pattern = r'\b\d{2}[./]\d{2}[./]\d{4}\b'
+    for path in image_paths:
+        gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            print(f"{path}: cannot read")
+            continue
+        _, binary = cv2.threshold(gray, 128, 255, cv2.THRESH_BINARY)
+        engines = [("cnn", lambda: " ".join(recognizer.image_to_data(binary)["text"]))]
+        try:
+            import pytesseract  # noqa: F401
+            engines.append(("tesseract", lambda: _tesseract_read(binary)))
+        except ImportError:
+            pass
+        for name, read in engines:
+            start = time.perf_counter()
+            for _ in range(repeats):
+                text = read()
+            seconds = (time.perf_counter() - start) / repeats
+            match = re.search(pattern, text)
+            print(f"{path} {name}: {seconds * 1000:.1f} ms, date {match.group(0) if match else None}")
+
+def benchmark_batching(model_path, crop_counts=(1, 4, 10, 16, 32, 64), repeats=20):
+    """
+    Compares classifying the crops of a frame one inference at a time (as
+    digitDetect 4.py used to) with a single batched classify() call.
+    Args:
+        model_path (str): Exported digit classifier.
+        crop_counts (tuple): Numbers of digit crops per frame to time.
+        repeats (int): Frames timed per count.
+    """
+    classifier = DigitClassifier(model_path)
+    rng = np.random.default_rng(0)
+    for count in crop_counts:
+        digits = rng.integers(0, 256, (count, DIGIT_SIZE, DIGIT_SIZE), dtype=np.uint8)
+        classifier.classify(digits)  # Warm up at this batch size
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            for digit in digits:
+                classifier.predict((digit.astype(np.float32) / 255)[None])
+        single = (time.perf_counter() - start) / repeats
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            classifier.classify(digits)
+        batched = (time.perf_counter() - start) / repeats
+        print(f"{count:>3} crops/frame: per crop {single * 1000:7.2f} ms, batched {batched * 1000:6.2f} ms ({single / batched:.1f}x)")
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python3 digitRecognizer.py <model.tflite|model.onnx> [image ...]")
+        print("With images, compares the recogniser with Tesseract; without, benchmarks batching.")
+        sys.exit(1)
+    if len(sys.argv) == 2:
+        benchmark_batching(sys.argv[1])
+    else:
+        benchmark(sys.argv[1], sys.argv[2:])
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+
+import multiprocessing
+import os
+import time
+from multiprocessing import shared_memory
+import numpy as np
+
+# Columns of the slot header
+SEQUENCE, REFS, STATE = range(3)
+
+# Slot states
+FREE, WRITING, PUBLISHED = range(3)
+
+def _attach(name):
+    """
+    Attaches to an existing shared memory block without registering it with
+    this process's resource tracker (only the creating process unlinks it).
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13 has no track argument, skip the registration by hand
+        from multiprocessing import resource_tracker
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None if rtype == "shared_memory" else register(name, rtype)
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+class FramePool:
+    """
+    Fixed set of frame slots in shared memory, shared by the capture thread
+    and the processing workers (threads or processes).
+    Frames are written straight into a slot and only the small handle
+    (slot index, sequence number) is passed through queues, so frames are
+    never pickled or copied between processes. A slot is recycled once every
+    consumer it was published to has released it; the sequence number makes
+    a handle to a recycled slot detectably stale.
+
+    The pool can be passed to a multiprocessing.Process, which attaches to
+    the same shared memory.
+    """
+    def __init__(self, slots=12, shape=(480, 640, 3), dtype=np.uint8):
+        """
+        Args:
+            slots (int): Number of frames the pool holds.
+            shape (tuple): Shape of one frame.
+            dtype: Frame element type.
+        """
+        self.slots = slots
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        frame_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        self._frames_block = shared_memory.SharedMemory(create=True, size=frame_bytes * slots)
+        # One header row per slot, plus a last row whose first cell is the sequence counter
+        self._header_block = shared_memory.SharedMemory(create=True, size=(slots + 1) * 3 * 8)
+        self.lock = multiprocessing.Lock()
+        self._creator = os.getpid()  # Only the creating process frees the memory
+        self._map()
+        self.header[:] = 0
+
+    def _map(self):
+        """
+        Creates the NumPy views onto the shared memory blocks.
+        """
+        self.frames = np.ndarray((self.slots,) + self.shape, dtype=self.dtype, buffer=self._frames_block.buf)
+        self.header = np.ndarray((self.slots + 1, 3), dtype=np.int64, buffer=self._header_block.buf)
+        self._next = 0
+
+    def __getstate__(self):
+        return {
+            "slots": self.slots, "shape": self.shape, "dtype": self.dtype.str, "lock": self.lock,
+            "frames_name": self._frames_block.name, "header_name": self._header_block.name,
+        }
+
+    def __setstate__(self, state):
+        self.slots = state["slots"]
+        self.shape = state["shape"]
+        self.dtype = np.dtype(state["dtype"])
+        self.lock = state["lock"]
+        self._frames_block = _attach(state["frames_name"])
+        self._header_block = _attach(state["header_name"])
+        self._creator = None
+        self._map()
+
+    def acquire(self):
+        """
+        Reserves a free slot for writing.
+        Returns:
+            int: Slot index, or None if every slot is in use.
+        """
+        with self.lock:
+            for offset in range(self.slots):
+                slot = (self._next + offset) % self.slots
+                if self.header[slot, STATE] == FREE:
+                    self.header[slot, STATE] = WRITING
+                    self._next = slot + 1
+                    return slot
+        return None
+
+    def buffer(self, slot):
+        """
+        Returns the writable frame array of an acquired slot.
+        """
+        return self.frames[slot]
+
+    def publish(self, slot, consumers=1):
+        """
+        Makes a written slot available to consumers.
+        Args:
+            slot (int): Slot returned by acquire().
+            consumers (int): Number of release() calls before the slot is recycled.
+        Returns:
+            tuple: Handle (slot, sequence) to pass to the consumers.
+        """
+        with self.lock:
+            self.header[self.slots, 0] += 1
+            sequence = int(self.header[self.slots, 0])
+            self.header[slot] = (sequence, consumers, PUBLISHED)
+        return slot, sequence
+
+    def abandon(self, slot):
+        """
+        Returns an acquired slot without publishing it.
+        """
+        with self.lock:
+            self.header[slot, STATE] = FREE
+
+    def view(self, handle):
+        """
+        Returns the frame a handle refers to (a view, not a copy).
+        Args:
+            handle (tuple): Handle from publish().
+        Returns:
+            numpy.ndarray: The frame, or None if the handle is stale.
+        """
+        slot, sequence = handle
+        if self.header[slot, SEQUENCE] != sequence or self.header[slot, STATE] != PUBLISHED:
+            return None
+        return self.frames[slot]
+
+    def release(self, handle):
+        """
+        Signals that one consumer is done with a frame; the slot is recycled after the last one.
+        """
+        slot, sequence = handle
+        with self.lock:
+            if self.header[slot, SEQUENCE] == sequence and self.header[slot, STATE] == PUBLISHED:
+                self.header[slot, REFS] -= 1
+                if self.header[slot, REFS] <= 0:
+                    self.header[slot, STATE] = FREE
+
+    def in_use(self):
+        """
+        Returns:
+            int: Number of slots currently being written or waiting for consumers.
+        """
+        return int(np.count_nonzero(self.header[:self.slots, STATE] != FREE))
+
+    def unlink(self):
+        """
+        Frees the shared memory once every process has unmapped it (creating process only).
+        Unlike close() this is safe while other threads may still touch the frames.
+        """
+        if self._creator == os.getpid():
+            self._creator = None
+            self._frames_block.unlink()
+            self._header_block.unlink()
+
+    def close(self):
+        """
+        Detaches from the shared memory; the creating process also frees it.
+        """
+        self.unlink()
+        # The NumPy views must go before the blocks can be closed
+        del self.frames, self.header
+        self._frames_block.close()
+        self._header_block.close()
+
+def _queue_consumer(frames, results):
+    """
+    Benchmark consumer receiving pickled frames through a queue.
+    """
+    while True:
+        frame = frames.get()
+        if frame is None:
+            break
+        results.put(int(frame[0, 0, 0]))
+
+def _pool_consumer(pool, handles, results):
+    """
+    Benchmark consumer receiving slot handles and reading frames from the pool.
+    """
+    while True:
+        handle = handles.get()
+        if handle is None:
+            break
+        frame = pool.view(handle)
+        results.put(int(frame[0, 0, 0]) if frame is not None else -1)
+        pool.release(handle)
+    pool.close()
+
+def benchmark(frames=300, shape=(480, 640, 3)):
+    """
+    Compares passing frames to a worker process through a pickling queue
+    against passing shared memory slot handles.
+    """
+    frame = np.random.default_rng(0).integers(0, 256, shape, dtype=np.uint8)
+
+    items, results = multiprocessing.Queue(), multiprocessing.Queue()
+    worker = multiprocessing.Process(target=_queue_consumer, args=(items, results))
+    worker.start()
+    start = time.perf_counter()
+    for _ in range(frames):
+        items.put(frame)
+        results.get()  # One frame in flight, like the capture -> OCR hand-off
+    queue_seconds = time.perf_counter() - start
+    items.put(None)
+    worker.join()
+
+    pool = FramePool(4, shape)
+    items, results = multiprocessing.Queue(), multiprocessing.Queue()
+    worker = multiprocessing.Process(target=_pool_consumer, args=(pool, items, results))
+    worker.start()
+    start = time.perf_counter()
+    for _ in range(frames):
+        slot = pool.acquire()
+        np.copyto(pool.buffer(slot), frame)  # The camera writes here directly in the sorter
+        items.put(pool.publish(slot))
+        results.get()
+    pool_seconds = time.perf_counter() - start
+    items.put(None)
+    worker.join()
+    leaked = pool.in_use()
+    pool.close()
+
+    print(f"pickled queue: {queue_seconds / frames * 1000:.3f} ms/frame")
+    print(f"frame pool:    {pool_seconds / frames * 1000:.3f} ms/frame (slots still in use: {leaked})")
+
+if __name__ == "__main__":
+    benchmark()
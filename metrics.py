@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class _Sharded:
+    """
+    Base for metrics updated without locks.
+    Every thread writes to its own shard, so an update never contends with
+    another thread; readers sum the shards, which may be a few updates stale.
+    """
+    def __init__(self, size):
+        self._size = size
+        self._local = threading.local()
+        self._shards = []
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = [0] * self._size
+            self._local.shard = shard
+            self._shards.append(shard)  # list.append is atomic
+        return shard
+
+    def _total(self):
+        totals = [0] * self._size
+        for shard in list(self._shards):
+            for i, value in enumerate(shard):
+                totals[i] += value
+        return totals
+
+class Counter(_Sharded):
+    """
+    Monotonic event counter.
+    """
+    def __init__(self):
+        super().__init__(1)
+
+    def inc(self, amount=1):
+        self._shard()[0] += amount
+
+    def value(self):
+        return self._total()[0]
+
+class Histogram(_Sharded):
+    """
+    Latency histogram with fixed buckets; the last two slots hold the +Inf count and the sum.
+    """
+    def __init__(self, buckets=BUCKETS):
+        super().__init__(len(buckets) + 2)
+        self.buckets = buckets
+
+    def observe(self, value):
+        shard = self._shard()
+        shard[bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+    def snapshot(self):
+        """
+        Returns:
+            tuple: (cumulative bucket counts including +Inf, count, sum)
+        """
+        totals = self._total()
+        cumulative, running = [], 0
+        for count in totals[:-1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, running, totals[-1]
+
+class _Stage:
+    """
+    Context manager timing one pass through a pipeline stage.
+    """
+    __slots__ = ("name", "histogram", "latency", "start")
+
+    def __init__(self, name, histogram, latency):
+        self.name = name
+        self.histogram = histogram
+        self.latency = latency
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        self.histogram.observe(elapsed)
+        if self.latency is not None:
+            self.latency[self.name] = elapsed
+        return False
+
+class Registry:
+    """
+    Holds the stage histograms and counters and renders them as Prometheus text.
+    """
+    def __init__(self, prefix="expiriobot"):
+        self.prefix = prefix
+        self.histograms = {}
+        self.counters = {}
+        self._create_lock = threading.Lock()  # Only taken the first time a name is seen
+
+    def _get(self, table, name, factory):
+        metric = table.get(name)
+        if metric is None:
+            with self._create_lock:
+                metric = table.setdefault(name, factory())
+        return metric
+
+    def stage(self, name, latency=None):
+        """
+        Times a block of code as pipeline stage `name`.
+        Args:
+            name (str): Stage name, e.g. 'capture', 'ocr'.
+            latency (dict): Optional dict the elapsed seconds are also stored in.
+        """
+        return _Stage(name, self._get(self.histograms, name, Histogram), latency)
+
+    def inc(self, name, amount=1):
+        """
+        Increments counter `name`.
+        """
+        self._get(self.counters, name, Counter).inc(amount)
+
+    def _snapshot(self):
+        """
+        Copies the metric tables under the creation lock, as a stage seen for the
+        first time on another thread would otherwise resize a dict being iterated.
+        Returns:
+            tuple: (sorted (name, histogram) pairs, sorted (name, counter) pairs)
+        """
+        with self._create_lock:
+            return sorted(self.histograms.items()), sorted(self.counters.items())
+
+    def render(self):
+        """
+        Returns:
+            str: All metrics in the Prometheus text exposition format.
+        """
+        histograms, counters = self._snapshot()
+        lines = [f"# TYPE {self.prefix}_stage_seconds histogram"]
+        for name, histogram in histograms:
+            cumulative, count, total = histogram.snapshot()
+            for bound, value in zip(histogram.buckets + ("+Inf",), cumulative):
+                lines.append(f'{self.prefix}_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {value}')
+            lines.append(f'{self.prefix}_stage_seconds_sum{{stage="{name}"}} {total:.6f}')
+            lines.append(f'{self.prefix}_stage_seconds_count{{stage="{name}"}} {count}')
+        for name, counter in counters:
+            lines.append(f"# TYPE {self.prefix}_{name}_total counter")
+            lines.append(f"{self.prefix}_{name}_total {counter.value()}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """
+        Returns:
+            str: One line per stage with count and mean latency, plus the counters.
+        """
+        histograms, counters = self._snapshot()
+        lines = []
+        for name, histogram in histograms:
+            _, count, total = histogram.snapshot()
+            mean = total / count * 1000 if count else 0.0
+            lines.append(f"{name:<12} n={count:<6} mean={mean:.2f} ms")
+        for name, counter in counters:
+            lines.append(f"{name:<12} {counter.value()}")
+        return "\n".join(lines)
+
+# Process-wide registry used by the pipeline
+registry = Registry()
+stage = registry.stage
+inc = registry.inc
+
+def serve(port=9108, host="127.0.0.1"):
+    """
+    Exposes the registry at http://host:port/metrics from a daemon thread.
+    Returns:
+        ThreadingHTTPServer: The running server (call shutdown() to stop it).
+    """
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Keep scrapes out of the console
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def dump_periodically(interval=60.0):
+    """
+    Prints the metric summary every `interval` seconds from a daemon thread.
+    """
+    def dump():
+        while True:
+            time.sleep(interval)
+            print(registry.summary())
+    threading.Thread(target=dump, daemon=True).start()
+
+def benchmark(iterations=200000):
+    """
+    Measures the overhead a stage timer adds to each pass.
+    """
+    bench = Registry()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        pass
+    bare = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        with bench.stage("bench"):
+            pass
+    timed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        bench.inc("bench")
+    counted = time.perf_counter() - start
+    print(f"stage timer: {(timed - bare) / iterations * 1e6:.2f} us/pass, "
+          f"counter: {(counted - bare) / iterations * 1e6:.2f} us/inc")
+
+if __name__ == "__main__":
+    benchmark()
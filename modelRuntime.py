@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import time
+import numpy as np
+
+class Model:
+    """
+    Inference-only runner for exported models (.tflite or .onnx), so the
+    sorter and the Learning Curve scripts do not need TensorFlow on the Pi.
+    .tflite models run on tflite_runtime (or ai_edge_litert) and .onnx models
+    on ONNX Runtime when installed; otherwise both fall back to OpenCV's dnn
+    module, which is already loaded for the camera pipeline. Quantised
+    inputs and outputs are converted, so callers always pass and receive floats.
+    """
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Exported model file.
+        """
+        self.path = path
+        self.interpreter = self.session = self.net = None
+        extension = os.path.splitext(path)[1].lower()
+        if extension == ".tflite":
+            interpreter = _tflite_interpreter()
+            if interpreter is not None:
+                self.interpreter = interpreter(model_path=path)
+                self.interpreter.allocate_tensors()
+                self.input = self.interpreter.get_input_details()[0]
+                self.output = self.interpreter.get_output_details()[0]
+                self.batch_size = int(self.input["shape"][0])
+                self.runtime = "tflite"
+                return
+        elif extension == ".onnx":
+            try:
+                import onnxruntime
+                self.session = onnxruntime.InferenceSession(path, providers=["CPUExecutionProvider"])
+                self.input_name = self.session.get_inputs()[0].name
+                self.runtime = "onnxruntime"
+                return
+            except ImportError:
+                pass
+        import cv2
+        self.net = cv2.dnn.readNet(path)
+        self.runtime = "cv2.dnn"
+
+    def input_shape(self):
+        """
+        Returns:
+            tuple: Input shape with the batch dimension, or None if the runtime does not report it.
+        """
+        if self.interpreter is not None:
+            return tuple(int(d) for d in self.input["shape"])
+        if self.session is not None:
+            return tuple(d if isinstance(d, int) else 1 for d in self.session.get_inputs()[0].shape)
+        return None
+
+    def predict(self, batch):
+        """
+        Runs one inference over a batch.
+        Args:
+            batch (numpy.ndarray): Float32 input with the batch as the first dimension.
+        Returns:
+            numpy.ndarray: The first output, as float32.
+        """
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+        if self.interpreter is not None:
+            return self._predict_tflite(batch)
+        if self.session is not None:
+            return self.session.run(None, {self.input_name: batch})[0]
+        self.net.setInput(batch)
+        return self.net.forward()
+
+    def _predict_tflite(self, batch):
+        if len(batch) != self.batch_size:
+            # TFLite models are exported with batch 1; resize to the batch actually used
+            self.interpreter.resize_tensor_input(self.input["index"], batch.shape)
+            self.interpreter.allocate_tensors()
+            self.input = self.interpreter.get_input_details()[0]
+            self.output = self.interpreter.get_output_details()[0]
+            self.batch_size = len(batch)
+        scale, zero_point = self.input["quantization"]
+        if scale:
+            batch = np.clip(np.round(batch / scale + zero_point), *_integer_range(self.input["dtype"]))
+        self.interpreter.set_tensor(self.input["index"], batch.astype(self.input["dtype"]))
+        self.interpreter.invoke()
+        output = self.interpreter.get_tensor(self.output["index"])
+        scale, zero_point = self.output["quantization"]
+        if scale:
+            output = (output.astype(np.float32) - zero_point) * scale
+        return output.astype(np.float32, copy=False)
+
+def _tflite_interpreter():
+    """
+    Returns the Interpreter class of the first lightweight TFLite runtime installed, or None.
+    """
+    for module in ("tflite_runtime.interpreter", "ai_edge_litert.interpreter"):
+        try:
+            return __import__(module, fromlist=["Interpreter"]).Interpreter
+        except ImportError:
+            continue
+    return None
+
+def _integer_range(dtype):
+    info = np.iinfo(dtype)
+    return info.min, info.max
+
+def load_model(path):
+    """
+    Loads an exported model for inference.
+    Args:
+        path (str): .tflite or .onnx file.
+    Returns:
+        Model: The runner.
+    """
+    return Model(path)
+
+def calibration_images(folder, size, channels=1, limit=200):
+    """
+    Loads the images the int8 quantisation is calibrated on, prepared like the
+    model's inputs (resized, scaled to 0-1).
+    Args:
+        folder (str): Folder of sample inputs as the model sees them (e.g.
+            28x28 white-on-black digit crops, or camera frames for YOLO).
+        size (tuple): Model input (width, height).
+        channels (int): 1 for grayscale models, 3 for RGB.
+        limit (int): Largest number of images used.
+    Returns:
+        list: Float32 arrays of shape (1, height, width, channels).
+    """
+    import cv2
+    images = []
+    for name in sorted(os.listdir(folder))[:limit]:
+        image = cv2.imread(os.path.join(folder, name), cv2.IMREAD_GRAYSCALE if channels == 1 else cv2.IMREAD_COLOR)
+        if image is None:
+            continue
+        image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+        if channels == 1:
+            image = image[:, :, None]
+        else:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        images.append((image.astype(np.float32) / 255)[None])
+    if not images:
+        raise ValueError(f"No calibration images in {folder}")
+    return images
+
+def export_tflite(keras_path, output_path, calibration):
+    """
+    Converts a Keras model to a full-integer (int8 weights and activations) TFLite
+    model with float input and output. Run on a machine with TensorFlow.
+    Args:
+        keras_path (str): .h5 model.
+        output_path (str): .tflite file to write.
+        calibration (list): Representative inputs from calibration_images().
+    """
+    import tensorflow as tf
+    model = tf.keras.models.load_model(keras_path, compile=False)
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = lambda: ([image] for image in calibration)
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    with open(output_path, "wb") as f:
+        f.write(converter.convert())
+
+def export_onnx(keras_path, output_path, calibration=None):
+    """
+    Converts a Keras model to ONNX and quantises it to int8: statically when
+    calibration inputs are given, otherwise weights only. Needs TensorFlow,
+    tf2onnx and onnxruntime.
+    Args:
+        keras_path (str): .h5 model.
+        output_path (str): .onnx file to write.
+        calibration (list): Optional representative inputs from calibration_images().
+    """
+    import tensorflow as tf
+    import tf2onnx
+    from onnxruntime import quantization
+    model = tf.keras.models.load_model(keras_path, compile=False)
+    float_path = output_path + ".float.onnx"
+    tf2onnx.convert.from_keras(model, opset=13, output_path=float_path)
+    if calibration is None:
+        quantization.quantize_dynamic(float_path, output_path, weight_type=quantization.QuantType.QInt8)
+    else:
+        class Reader(quantization.CalibrationDataReader):
+            def __init__(self):
+                self.inputs = iter({model.inputs[0].name.split(":")[0]: image} for image in calibration)
+
+            def get_next(self):
+                return next(self.inputs, None)
+        quantization.quantize_static(float_path, output_path, Reader(), weight_type=quantization.QuantType.QInt8)
+    os.remove(float_path)
+
+def _rss_kb():
+    """
+    Current resident set size (Linux), falling back to the peak RSS.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def _run_benchmark(path, runs, batch, input_shape, result_queue):
+    """
+    Loads and runs one model in a fresh process, so the import cost and RSS
+    of each runtime are measured on their own.
+    """
+    before = _rss_kb()
+    start = time.perf_counter()
+    if path.endswith((".h5", ".keras")):
+        from tensorflow.keras.models import load_model as load_keras
+        keras_model = load_keras(path, compile=False)
+        shape = (batch,) + tuple(keras_model.inputs[0].shape[1:])
+        predict = lambda inputs: np.asarray(keras_model(inputs, training=False))
+        runtime = "keras"
+    else:
+        model = load_model(path)
+        shape = model.input_shape()
+        predict = model.predict
+        runtime = model.runtime
+    load_seconds = time.perf_counter() - start
+    shape = (batch,) + tuple((shape or input_shape)[1:])
+
+    inputs = np.random.default_rng(0).random(shape, dtype=np.float32)
+    predict(inputs)  # The first run allocates the buffers
+    start = time.perf_counter()
+    for _ in range(runs):
+        predict(inputs)
+    result_queue.put({
+        "path": path, "runtime": runtime, "load_seconds": load_seconds,
+        "ms_per_run": (time.perf_counter() - start) * 1000 / runs,
+        "rss_kb": _rss_kb(), "rss_added_kb": _rss_kb() - before,
+        "size_kb": os.path.getsize(path) / 1024,
+    })
+
+def benchmark(paths, runs=50, batch=1, input_shape=None):
+    """
+    Compares models (e.g. the Keras .h5 and its int8 .tflite/.onnx exports) on
+    load time including the runtime import, resident memory and latency.
+    Args:
+        paths (list): Model files.
+        runs (int): Inferences timed per model.
+        batch (int): Batch size of each inference.
+        input_shape (tuple): Input shape used when the runtime does not report
+            one, as with cv2.dnn (e.g. (1, 28, 28, 1)).
+    """
+    import multiprocessing
+    context = multiprocessing.get_context("spawn")  # Nothing inherited from this process
+    result_queue = context.Queue()
+    for path in paths:
+        process = context.Process(target=_run_benchmark, args=(path, runs, batch, input_shape, result_queue))
+        process.start()
+        process.join()
+        if process.exitcode != 0:
+            print(f"{path}: failed (exit code {process.exitcode})")
+            continue
+        result = result_queue.get()
+        print(f"{result['path']} [{result['runtime']}]: file {result['size_kb']:.0f} KiB, "
+              f"load {result['load_seconds']:.2f} s, RSS {result['rss_kb'] / 1024:.0f} MiB "
+              f"(+{result['rss_added_kb'] / 1024:.0f} MiB), {result['ms_per_run']:.2f} ms/inference (batch {batch})")
+
+def main():
+    """
+    Usage:
+        python3 modelRuntime.py export <model.h5> <output.tflite|output.onnx> [calibration folder] [width height channels]
+        python3 modelRuntime.py benchmark <model> [model ...] [--shape 1,416,416,3]
+    --shape is used for models whose runtime does not report the input shape
+    (cv2.dnn); it defaults to that of the 28x28 digit model.
+    """
+    if len(sys.argv) >= 4 and sys.argv[1] == "export":
+        keras_path, output_path = sys.argv[2], sys.argv[3]
+        calibration = None
+        if len(sys.argv) > 4:
+            width, height, channels = (int(v) for v in sys.argv[5:8]) if len(sys.argv) >= 8 else (28, 28, 1)
+            calibration = calibration_images(sys.argv[4], (width, height), channels)
+        if output_path.endswith(".tflite"):
+            if calibration is None:
+                print("An int8 TFLite export needs a calibration folder")
+                sys.exit(1)
+            export_tflite(keras_path, output_path, calibration)
+        else:
+            export_onnx(keras_path, output_path, calibration)
+        print(f"Wrote {output_path}")
+    elif len(sys.argv) >= 3 and sys.argv[1] == "benchmark":
+        paths, input_shape = sys.argv[2:], (1, 28, 28, 1)
+        if "--shape" in paths:
+            position = paths.index("--shape")
+            input_shape = tuple(int(d) for d in paths[position + 1].split(","))
+            paths = paths[:position] + paths[position + 2:]
+        benchmark(paths, input_shape=input_shape)
+    else:
+        print(main.__doc__)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
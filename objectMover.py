@@ -2,6 +2,7 @@
 #coding=utf-8
 import time
 from Arm_Lib import Arm_Device
+from armKinematics import POSES
 
 # Initialize DOFBOT
 Arm = Arm_Device()
@@ -29,12 +30,12 @@ def arm_move(p, s_time=500):
         time.sleep(0.01)
     time.sleep(s_time / 1000)
 
-# Positions for different actions
-p_front = [90, 60, 50, 50, 90]  # Front position
-p_right = [0, 60, 50, 50, 90]   # Right position
-p_left = [180, 60, 50, 50, 90]  # Left position
-p_top = [90, 80, 50, 50, 90]    # Top (transition) position
-p_rest = [90, 130, 0, 0, 90]    # Rest position
+# Positions for different actions, from the pose table shared with ExpirioBot.py
+p_front = POSES["mover_front"]  # Front position
+p_right = POSES["mover_right"]  # Right position
+p_left = POSES["mover_left"]    # Left position
+p_top = POSES["top"]            # Top (transition) position
+p_rest = POSES["mover_rest"]    # Rest position
 
 def move_object(target):
     """
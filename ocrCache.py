@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+
+import base64
+import json
+import os
+import threading
+import zlib
+from collections import OrderedDict
+import cv2
+import numpy as np
+import metrics
+
+# Pixels around the date region searched for the shifted date of a new unit
+SEARCH_PAD = 6
+
+def ink_hash(image, bits=64):
+    """
+    Perceptual hash of a printed date: the column ink profile of the text's
+    bounding box, one bit per step saying whether the profile rises. Cropping
+    to the ink first makes it shift tolerant, and averaging down the columns
+    makes it tolerant of speckle noise.
+    Args:
+        image: Binary image region, dark text on white.
+        bits (int): Hash length.
+    Returns:
+        int: The hash (0 if there is no ink).
+    """
+    ink = image < 128
+    columns = np.flatnonzero(ink.mean(axis=0) > 0.1)
+    rows = np.flatnonzero(ink.mean(axis=1) > 0.05)
+    if len(columns) == 0 or len(rows) == 0:
+        return 0
+    profile = ink[rows[0]:rows[-1] + 1, columns[0]:columns[-1] + 1].mean(axis=0, dtype=np.float32)
+    profile = cv2.resize(profile[None, :], (bits + 1, 1), interpolation=cv2.INTER_AREA)[0]
+    return int.from_bytes(np.packbits(profile[1:] > profile[:-1]).tobytes(), "big")
+
+def _crop(image, region, pad=0):
+    """
+    Crops a (x, y, w, h) region grown by `pad` pixels (clipped to the image),
+    or returns None if the region itself falls outside the image.
+    """
+    x, y, w, h = region
+    if w <= 0 or h <= 0 or x < 0 or y < 0 or y + h > image.shape[0] or x + w > image.shape[1]:
+        return None
+    return image[max(y - pad, 0):y + h + pad, max(x - pad, 0):x + w + pad]
+
+def date_region(boxes, shape, margin=4):
+    """
+    Bounding region of the OCR word boxes of a date, padded and clipped to the image.
+    Args:
+        boxes (list): (x, y, w, h) word boxes.
+        shape (tuple): Shape of the image the boxes are in.
+        margin (int): Padding in pixels on each side.
+    Returns:
+        tuple: (x, y, w, h) region.
+    """
+    x0 = max(min(x for x, _, _, _ in boxes) - margin, 0)
+    y0 = max(min(y for _, y, _, _ in boxes) - margin, 0)
+    x1 = min(max(x + w for x, _, w, _ in boxes) + margin, shape[1])
+    y1 = min(max(y + h for _, y, _, h in boxes) + margin, shape[0])
+    return x0, y0, x1 - x0, y1 - y0
+
+class OcrCache:
+    """
+    Bounded LRU cache of OCR results keyed by a perceptual hash of the date region.
+    The same SKU and lot keeps coming down the line, so once a label has been
+    read the date region of the next unit looks (nearly) the same. The hash
+    only shortlists candidates, since dates one digit apart hash alike; a
+    candidate is reused after its stored crop matches the new one at full
+    resolution, so Tesseract only runs for labels that have not been seen.
+    """
+    def __init__(self, capacity=256, max_distance=10, max_difference=0.06, max_checks=8, path="ocr_cache.json"):
+        """
+        Args:
+            capacity (int): Entries kept before the least recently used is evicted.
+            max_distance (int): Largest Hamming distance (of 64 bits) for a candidate.
+            max_difference (float): Largest local pixel difference (0-1) between the
+                aligned crops that still counts as the same date.
+            max_checks (int): Candidates verified per lookup, closest hash first.
+            path (str): File the cache is persisted to, or None to keep it in memory only.
+        """
+        self.capacity = capacity
+        self.max_distance = max_distance
+        self.max_difference = max_difference
+        self.max_checks = max_checks
+        self.path = path
+        self.entries = OrderedDict()  # (hash, date) -> entry dict, least recently used first
+        self.hits = self.misses = self.rejected = self.evictions = 0
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.load()
+
+    @staticmethod
+    def difference(image, region, stored, pad=SEARCH_PAD):
+        """
+        Compares a stored date crop with the same region of a new image.
+        The crop is aligned within `pad` pixels first, then the difference is
+        averaged over digit-sized windows: one changed digit stands out while
+        scattered noise does not.
+        Args:
+            image: Preprocessed image to check.
+            region (tuple): (x, y, w, h) the crop was taken from.
+            stored: The stored crop.
+            pad (int): Largest shift searched in pixels.
+        Returns:
+            float: Worst local difference (0-1) above the typical one, or None if the region does not fit.
+        """
+        area = _crop(image, region, pad)
+        if area is None or area.shape[0] < stored.shape[0] or area.shape[1] < stored.shape[1]:
+            return None
+        height, width = stored.shape
+        _, _, _, (x, y) = cv2.minMaxLoc(-cv2.matchTemplate(area, stored, cv2.TM_SQDIFF))
+        windows = cv2.blur(cv2.absdiff(area[y:y + height, x:x + width], stored), (max(width // 12, 1), height))
+        return float(windows.max() - np.median(windows)) / 255
+
+    def lookup(self, image):
+        """
+        Looks for a cached result whose date region matches this image.
+        Args:
+            image: Preprocessed (binary, deskewed) image of the label.
+        Returns:
+            dict: Cached entry with 'date', 'text', 'confidence' and 'region', or None.
+        """
+        with self._lock:
+            hashes = {}  # The crop hash is computed once per distinct region
+            candidates = []
+            for key, entry in self.entries.items():
+                region = tuple(entry["region"])
+                if region not in hashes:
+                    crop = _crop(image, region, SEARCH_PAD)
+                    hashes[region] = ink_hash(crop) if crop is not None else None
+                if hashes[region] is None:
+                    continue
+                distance = bin(hashes[region] ^ key[0]).count("1")
+                if distance <= self.max_distance:
+                    candidates.append((distance, key))
+
+            for _, key in sorted(candidates)[:self.max_checks]:
+                entry = self.entries[key]
+                difference = self.difference(image, entry["region"], entry["crop"])
+                if difference is not None and difference <= self.max_difference:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    metrics.inc("ocr_cache_hits")
+                    return entry
+
+            if candidates:
+                self.rejected += 1  # Looked alike, but not close enough to trust the date
+            self.misses += 1
+            metrics.inc("ocr_cache_misses")
+            return None
+
+    def store(self, image, region, date, text=None, confidence=None):
+        """
+        Caches the OCR result for the date region of an image.
+        Args:
+            image: Preprocessed image the OCR ran on.
+            region (tuple): (x, y, w, h) of the date in that image.
+            date (str): Expiry date as read by the OCR.
+            text (str): Full OCR text.
+            confidence (float): OCR confidence of the date.
+        """
+        crop = _crop(image, region)
+        if crop is None:
+            return
+        with self._lock:
+            key = (ink_hash(_crop(image, region, SEARCH_PAD)), date)
+            self.entries[key] = {
+                "region": list(region), "date": date, "text": text,
+                "confidence": confidence, "crop": crop.copy(),
+            }
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+                metrics.inc("ocr_cache_evictions")
+
+    def stats(self):
+        """
+        Returns:
+            dict: Entry count, hit/miss/rejected/eviction counts and the hit rate.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries), "hits": self.hits, "misses": self.misses,
+            "rejected": self.rejected, "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def save(self):
+        """
+        Writes the cache to its file (atomically, through a temporary file).
+        """
+        if not self.path:
+            return
+        with self._lock:
+            data = [{
+                "hash": f"{key[0]:016x}", "region": entry["region"], "date": entry["date"],
+                "text": entry["text"], "confidence": entry["confidence"],
+                "crop": base64.b64encode(zlib.compress(entry["crop"].tobytes())).decode(),
+            } for key, entry in self.entries.items()]
+        temporary = self.path + ".tmp"
+        with open(temporary, "w") as f:
+            json.dump(data, f)
+        os.replace(temporary, self.path)
+
+    def load(self):
+        """
+        Reads the cache back from its file, keeping the stored LRU order.
+        """
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Could not load OCR cache: {e}")
+            return
+        with self._lock:
+            for item in data[-self.capacity:]:
+                _, _, width, height = item["region"]
+                crop = np.frombuffer(zlib.decompress(base64.b64decode(item["crop"])), dtype=np.uint8)
+                self.entries[(int(item["hash"], 16), item["date"])] = {
+                    "region": item["region"], "date": item["date"], "text": item["text"],
+                    "confidence": item["confidence"], "crop": crop.reshape(height, width),
+                }
+
+def _label(text):
+    """
+    Synthetic binary label with a printed date, for the benchmark.
+    """
+    image = np.full((240, 320), 255, np.uint8)
+    cv2.putText(image, text, (45, 92), cv2.FONT_HERSHEY_SIMPLEX, 1, 0, 2)
+    return image
+
+def benchmark(labels=20, repeats=10, path="ocr_cache_benchmark.json"):
+    """
+    Measures lookup cost and accuracy on synthetic labels: every cached label
+    is seen again shifted and with noise (should hit with the right date), and
+    labels one digit away from a cached one are looked up (should miss).
+    """
+    import time
+    rng = np.random.default_rng(0)
+    region = (40, 60, 200, 40)
+    dates = [f"{n + 1:02d}/0{n % 9 + 1}/2026" for n in range(labels)]
+    unseen = [f"{n + 1:02d}/0{n % 9 + 1}/2027" for n in range(labels)]
+    cache = OcrCache(capacity=labels, path=path)
+    for date in dates:
+        cache.store(_label(date), region, date)
+    cache.save()
+    cache = OcrCache(capacity=labels, path=path)  # Reload to include the persistence round trip
+    os.remove(path)
+
+    def noisy(image):
+        image = np.roll(image, (rng.integers(-3, 4), rng.integers(-4, 5)), axis=(0, 1))
+        return np.where(rng.random(image.shape) < 0.01, 255 - image, image).astype(np.uint8)
+
+    correct = wrong = false_hits = 0
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for date in dates:
+            entry = cache.lookup(noisy(_label(date)))
+            correct += entry is not None and entry["date"] == date
+            wrong += entry is not None and entry["date"] != date
+    seconds = time.perf_counter() - start
+    for date in unseen:
+        false_hits += cache.lookup(noisy(_label(date))) is not None
+
+    lookups = labels * repeats
+    print(f"lookup: {seconds / lookups * 1000:.3f} ms with {len(cache.entries)} entries")
+    print(f"repeat labels: {correct}/{lookups} hits, {wrong} wrong dates")
+    print(f"unseen labels: {false_hits}/{labels} false hits")
+    print(cache.stats())
+
+if __name__ == "__main__":
+    benchmark()
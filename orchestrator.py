@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+
+import asyncio
+import concurrent.futures
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+class Pipeline:
+    """
+    Asyncio orchestration of the sorter's stages:
+    capture -> gate -> read (OCR) -> decide -> actuate.
+
+    The stages are coroutines joined by bounded asyncio queues, so a slow
+    stage holds back the ones before it (awaitable backpressure) instead of
+    frames piling up or threads polling for work. Blocking work runs on an
+    executor thread per kind: camera reads and gating, OCR, and arm moves. Capture
+    pauses while the arm moves, and the frames captured before the move are
+    dropped. stop() cancels every stage; an arm move in progress is finished
+    first, so the arm is never left mid-move. pause() only stops the capture
+    stage: what was already captured is still read and sorted. No stage
+    polls, so an idle or paused pipeline uses next to no CPU (run this file
+    for the benchmark, or with 'stress' to check stopping under load). drain() pauses and waits for the items in flight, so
+    pause, drain, stop and start give a deterministic restart.
+
+    The stage functions are supplied by the caller:
+        capture() -> item, or None if nothing could be captured this time;
+            raises OSError when the camera fails.
+        gate(item) -> (item ID, or None to drop the item; seconds until the
+            next capture); runs on the capture thread.
+        discard(item): frees an item that will not be read (e.g. its frame pool slot).
+        read(item_id, item) -> result; runs on the OCR thread and takes over the item.
+        decide(result) -> action to actuate, or None.
+        actuate(action): runs on the arm thread.
+        resumed(): called on the capture thread when capture resumes after an arm move or a pause.
+        idle(): called on the OCR thread once no frame has come for idle_timeout seconds.
+    """
+    def __init__(self, capture, gate, read, decide, actuate, discard=None, resumed=None, idle=None,
+                 queue_size=2, retry_interval=0.1, idle_timeout=30.0):
+        """
+        Args:
+            capture, gate, read, decide, actuate, discard, resumed, idle: Stage functions, see above.
+            queue_size (int): Frames (and results) waiting between stages before
+                the stage in front of them waits.
+            retry_interval (float): Seconds before capturing again when capture() returned None.
+            idle_timeout (float): Seconds the read stage waits for a frame before calling idle().
+        """
+        self.capture = capture
+        self.gate = gate
+        self.read = read
+        self.decide = decide
+        self.actuate = actuate
+        self.discard = discard
+        self.resumed = resumed
+        self.queue_size = queue_size
+        self.retry_interval = retry_interval
+        self.idle = idle
+        self.idle_timeout = idle_timeout
+        self.paused = False
+        self.loop = None
+        self.task = None
+        self.thread = None
+
+    def start(self):
+        """
+        Starts the stages (not paused) on an event loop in a background thread.
+        """
+        if self.running():
+            return
+        self.paused = False
+        ready = threading.Event()
+        self.thread = threading.Thread(target=asyncio.run, args=(self._main(ready),), name="pipeline", daemon=True)
+        self.thread.start()
+        ready.wait()
+
+    def running(self):
+        """
+        Returns:
+            bool: True while the stages are running (until stop() or a camera failure).
+        """
+        return self.thread is not None and self.thread.is_alive()
+
+    def pause(self):
+        """
+        Stops capturing; frames already captured are still read and sorted.
+        """
+        self.paused = True
+        if self.running():
+            self.loop.call_soon_threadsafe(self.unpaused.clear)
+
+    def resume(self):
+        """
+        Resumes capturing after pause().
+        """
+        self.paused = False
+        if self.running():
+            self.loop.call_soon_threadsafe(self._resume)
+
+    def _resume(self):
+        if not self.unpaused.is_set():
+            self._run_resumed()  # What settles next may have been swapped during the pause
+            self.unpaused.set()
+
+    def _run_resumed(self):
+        """
+        Queues resumed() on the capture thread: it runs after any gate() call
+        still in progress there (both update the gate's state) and before the
+        next capture.
+        """
+        if self.resumed is not None:
+            self.executors["capture"].submit(self.resumed)
+
+    def drain(self, timeout=None):
+        """
+        Pauses capture and waits until every captured frame has been read,
+        decided on and, if needed, sorted by the arm.
+        Args:
+            timeout (float): Longest wait in seconds, or None to wait as long as it takes.
+        Returns:
+            bool: True once drained, False if the timeout expired first.
+        """
+        self.pause()
+        if not self.running():
+            return True
+        waiting = asyncio.run_coroutine_threadsafe(self.quiet.wait(), self.loop)
+        try:
+            waiting.result(timeout)
+        except concurrent.futures.TimeoutError:
+            waiting.cancel()
+            return False
+        except concurrent.futures.CancelledError:
+            pass  # The pipeline stopped meanwhile, so nothing is in flight
+        return True
+
+    def stop(self, timeout=None):
+        """
+        Cancels the stages and waits for them (and their executor threads) to finish.
+        Args:
+            timeout (float): Longest wait in seconds, or None to wait for the arm
+                to finish a move in progress.
+        """
+        if not self.running():
+            return
+        self.loop.call_soon_threadsafe(self.task.cancel)
+        self.thread.join(timeout)
+
+    async def _main(self, ready):
+        self.loop = asyncio.get_running_loop()
+        self.task = asyncio.current_task()
+        self.frames = asyncio.Queue(self.queue_size)
+        self.results = asyncio.Queue(self.queue_size)
+        self.actions = asyncio.Queue(1)
+        self.capture_allowed = asyncio.Event()
+        self.capture_allowed.set()
+        self.unpaused = asyncio.Event()
+        if not self.paused:
+            self.unpaused.set()
+        self.pending = 0  # Frames captured and not yet dropped, decided on or sorted
+        self.quiet = asyncio.Event()
+        self.quiet.set()
+        executors = {name: ThreadPoolExecutor(1, thread_name_prefix=name) for name in ("capture", "ocr", "arm")}
+        self.executors = executors
+        tasks = [
+            asyncio.create_task(self._capture_stage(executors["capture"]), name="capture"),
+            asyncio.create_task(self._read_stage(executors["ocr"]), name="read"),
+            asyncio.create_task(self._decide_stage(), name="decide"),
+            asyncio.create_task(self._actuate_stage(executors["arm"]), name="actuate"),
+        ]
+        ready.set()
+        try:
+            # Only the capture stage ends by itself (camera failure), which stops the rest too
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if not task.cancelled() and task.exception() is not None:
+                    print(f"Pipeline {task.get_name()} stage failed: {task.exception()!r}")
+        except asyncio.CancelledError:
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._drain(self.frames)
+            for executor in executors.values():
+                executor.shutdown(wait=True)
+
+    async def _call(self, executor, function, *args, release=None):
+        """
+        Runs a blocking stage function on its executor thread. If the stage
+        is cancelled meanwhile, the call still completes on its thread and
+        whatever it returns is passed to release().
+        """
+        future = executor.submit(function, *args)
+        try:
+            # Shielded: cancelling a call that has not started would otherwise skip it
+            return await asyncio.shield(asyncio.wrap_future(future))
+        except asyncio.CancelledError:
+            if release is not None:
+                def release_result(done):
+                    if not done.cancelled() and done.exception() is None and done.result() is not None:
+                        release(done.result())
+                future.add_done_callback(release_result)
+            raise
+
+    def _discard(self, item):
+        if self.discard is not None:
+            self.discard(item)
+
+    def _begin(self):
+        self.pending += 1
+        self.quiet.clear()
+
+    def _finish(self):
+        self.pending -= 1
+        if self.pending == 0:
+            self.quiet.set()
+
+    def _drop(self, item):
+        """
+        Drops a captured frame that will not be read.
+        """
+        self._discard(item)
+        self._finish()
+
+    def _drain(self, frames):
+        """
+        Drops the frames waiting in a queue.
+        """
+        while not frames.empty():
+            _, item = frames.get_nowait()
+            self._drop(item)
+
+    async def _capture_allowed(self):
+        """
+        Waits until capture is neither paused nor held for an arm move.
+        """
+        while not (self.unpaused.is_set() and self.capture_allowed.is_set()):
+            await self.unpaused.wait()
+            await self.capture_allowed.wait()
+
+    async def _capture_stage(self, executor):
+        while True:
+            await self._capture_allowed()
+            try:
+                item = await self._call(executor, self.capture, release=self._discard)
+            except OSError as e:
+                print(e)
+                return
+            if item is None:
+                await asyncio.sleep(self.retry_interval)
+                continue
+            self._begin()
+            if not (self.unpaused.is_set() and self.capture_allowed.is_set()):
+                self._drop(item)  # Paused, or the arm started moving, during the read
+                continue
+            gated = executor.submit(self.gate, item)
+            try:
+                item_id, delay = await asyncio.wrap_future(gated)
+            except asyncio.CancelledError:
+                gated.add_done_callback(lambda _: self._discard(item))
+                raise
+            if item_id is None:
+                self._drop(item)
+            else:
+                try:
+                    await self.frames.put((item_id, item))  # Waits while OCR is behind
+                except asyncio.CancelledError:
+                    self._drop(item)  # Not queued yet, so the final drain would miss it
+                    raise
+            await asyncio.sleep(delay)
+
+    async def _next_frame(self, timeout=None):
+        """
+        Takes the next frame off the queue, or returns None if none came within
+        timeout seconds. Unlike asyncio.wait_for() on Python 3.11, this never
+        swallows a cancellation that arrives together with a frame (stop()
+        would then wait forever); a frame already taken by then is dropped.
+        """
+        getting = asyncio.ensure_future(self.frames.get())
+        try:
+            done, _ = await asyncio.wait({getting}, timeout=timeout)
+        except asyncio.CancelledError:
+            getting.cancel()
+            if getting.done() and not getting.cancelled():
+                self._drop(getting.result()[1])
+            raise
+        if not done:
+            getting.cancel()  # A frame arriving meanwhile stays queued
+            return None
+        return getting.result()
+
+    async def _read_stage(self, executor):
+        while True:
+            frame = await self._next_frame(self.idle_timeout)
+            if frame is None:
+                if self.idle is not None:
+                    await self._call(executor, self.idle)
+                frame = await self._next_frame()  # Idle until the next item, once per idle spell
+            item_id, item = frame
+            result = await self._call(executor, self.read, item_id, item)
+            await self.results.put(result)
+
+    async def _decide_stage(self):
+        while True:
+            action = self.decide(await self.results.get())
+            if action is None:
+                self._finish()
+            else:
+                await self.actions.put(action)  # Waits while the arm is busy
+
+    async def _actuate_stage(self, executor):
+        while True:
+            action = await self.actions.get()
+            self.capture_allowed.clear()
+            self._drain(self.frames)  # They show the item that is about to be moved
+            move = asyncio.wrap_future(executor.submit(self.actuate, action))
+            try:
+                await asyncio.shield(move)
+            except asyncio.CancelledError:
+                await move  # Never leave the arm mid-move: finish it, then stop
+                raise
+            finally:
+                self._drain(self.frames)
+            self._finish()
+            self._run_resumed()
+            self.capture_allowed.set()
+
+def _spin_consumer(frame_queue_container, processing_event, stop_event):
+    """
+    The consumer loop of the threaded sorter (process_frames), reduced to its
+    polling of an empty frame queue; kept for the benchmark.
+    """
+    while not stop_event.is_set():
+        processing_event.wait()
+        current_queue = frame_queue_container[0]
+        if not current_queue.empty():
+            current_queue.get()
+
+def _cpu_percent(seconds):
+    """
+    Process CPU time over the next seconds, in percent of one core.
+    """
+    cpu, wall = time.process_time(), time.perf_counter()
+    time.sleep(seconds)
+    return (time.process_time() - cpu) / (time.perf_counter() - wall) * 100
+
+def benchmark(seconds=3.0):
+    """
+    Compares the CPU use with nothing to sort: the polling consumer thread
+    against the pipeline watching an empty pick zone, and paused.
+    """
+    print(f"nothing running:           {_cpu_percent(seconds):5.1f}% CPU")
+
+    stop_event, processing_event = threading.Event(), threading.Event()
+    processing_event.set()
+    consumer = threading.Thread(target=_spin_consumer, args=([queue.Queue(maxsize=10)], processing_event, stop_event), daemon=True)
+    consumer.start()
+    print(f"polling consumer thread:   {_cpu_percent(seconds):5.1f}% CPU")
+    stop_event.set()
+    consumer.join()
+
+    def capture():
+        time.sleep(1 / 30)  # A camera read blocks until the next frame
+        return object()
+    # The zone stays empty: every frame is dropped and the camera polled at the idle rate
+    pipeline = Pipeline(capture, lambda item: (None, 0.5), lambda item_id, item: None,
+                        lambda result: None, lambda action: None)
+    pipeline.start()
+    print(f"pipeline, empty zone:      {_cpu_percent(seconds):5.1f}% CPU")
+    pipeline.pause()
+    time.sleep(0.5)
+    print(f"pipeline, paused:          {_cpu_percent(seconds):5.1f}% CPU")
+    pipeline.stop()
+
+def stress_stop(cycles=250, seed=0):
+    """
+    Starts and stops a busy pipeline many times, at random points of its
+    work, checking that every stop returns and no captured item is lost.
+    Returns:
+        bool: True if every cycle stopped cleanly.
+    """
+    import random
+    rng = random.Random(seed)
+    lock = threading.Lock()
+    held = set()
+    count = [0]
+    def capture():
+        time.sleep(0.001)
+        with lock:
+            count[0] += 1
+            held.add(count[0])
+            return count[0]
+    def release(item):
+        with lock:
+            held.discard(item)
+    def read(item_id, item):
+        release(item)
+        time.sleep(rng.choice((0, 0.0005, 0.003)))  # Often slower than capture, so capture waits
+        return item
+    pipeline = Pipeline(capture, lambda item: (1, 0.0), read, lambda result: result if result % 7 == 0 else None,
+                        lambda action: time.sleep(0.002), discard=release, idle_timeout=0.002)
+    for cycle in range(cycles):
+        pipeline.start()
+        time.sleep(rng.uniform(0, 0.02))
+        stopping = threading.Thread(target=pipeline.stop, daemon=True)
+        stopping.start()
+        stopping.join(5)
+        if stopping.is_alive():
+            print(f"stop did not return in cycle {cycle}")
+            return False
+        if held:
+            print(f"{len(held)} items never released after cycle {cycle}")
+            return False
+    print(f"{cycles} start/stop cycles under load: every stop returned, no items lost")
+    return True
+
+if __name__ == "__main__":
+    if len(sys.argv) == 2 and sys.argv[1] == "stress":
+        sys.exit(0 if stress_stop() else 1)
+    benchmark()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+
+import json
+import math
+import os
+import sys
+import time
+from functools import lru_cache
+import cv2
+import numpy as np
+import armKinematics
+
+def product_rect(gray, roi=(0.0, 0.0, 1.0, 1.0), hints=(), min_area=0.02):
+    """
+    Finds the outline of the product in the pick zone.
+    Args:
+        gray: Grayscale camera frame.
+        roi (tuple): Pick zone as (x0, y0, x1, y1) fractions of the frame.
+        hints (list): Point arrays known to lie on the product (e.g. the date
+            or code corners); the outline containing them is preferred.
+        min_area (float): Smallest outline, as a fraction of the zone area.
+    Returns:
+        tuple: cv2.minAreaRect style ((cx, cy), (w, h), angle) in frame pixels,
+        or None if nothing product-sized was found.
+    """
+    height, width = gray.shape[:2]
+    x0, y0, x1, y1 = roi
+    left, top = int(x0 * width), int(y0 * height)
+    zone = gray[top:int(y1 * height), left:int(x1 * width)]
+    edges = cv2.Canny(cv2.GaussianBlur(zone, (5, 5), 0), 50, 150)
+    # Close the gaps in the product's edge so it comes out as one outline
+    edges = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, np.ones((9, 9), np.uint8))
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    contours = [contour for contour in contours if cv2.contourArea(contour) >= min_area * zone.size]
+
+    points = [np.asarray(hint, dtype=np.float32).reshape(-1, 2) for hint in hints]
+    centre = np.concatenate(points).mean(axis=0) - (left, top) if points else None
+    if centre is not None:
+        containing = [contour for contour in contours if cv2.pointPolygonTest(contour, tuple(float(v) for v in centre), False) >= 0]
+        contours = containing or contours
+    if not contours:
+        if centre is None:
+            return None
+        # No outline: grasp where the label is, with the gripper in its default orientation
+        return (float(centre[0] + left), float(centre[1] + top)), (0.0, 0.0), 0.0
+    (cx, cy), size, angle = cv2.minAreaRect(max(contours, key=cv2.contourArea))
+    return (cx + left, cy + top), size, angle
+
+def detection_rect(detection):
+    """
+    Converts a YOLODetector detection dict to a product_rect() style rectangle.
+    """
+    x, y, w, h = detection["x"], detection["y"], detection["width"], detection["height"]
+    return (x + w / 2, y + h / 2), (w, h), 0.0
+
+class PickLocator:
+    """
+    Works out where to grasp a product from where the camera sees it, so items
+    no longer have to be placed exactly at p_front. A homography maps frame
+    pixels to the table plane in the arm frame (see calibrate()). The
+    approach and grasp joints of every table cell under the pick zone can be
+    looked up in one batch from the reach grid (see precompute()); cells
+    outside it are solved by inverse kinematics for each cell and wrist angle
+    and cached, since products keep landing in the same few places.
+    """
+    def __init__(self, calibration_path="arm_calibration.json", grasp_height=20, approach_height=60,
+                 cell_mm=5, roll_step=15, cache_size=256):
+        """
+        Args:
+            calibration_path (str): JSON file written by calibrate().
+            grasp_height (float): Height of the grip point above the table in millimetres.
+            approach_height (float): Height above the grasp the gripper descends from.
+            cell_mm (float): Table positions are rounded to cells of this size before solving.
+            roll_step (float): Wrist angles are rounded to steps of this many degrees.
+            cache_size (int): Solved (cell, wrist angle) poses kept.
+        """
+        self.homography = None
+        if calibration_path and os.path.exists(calibration_path):
+            with open(calibration_path) as f:
+                self.homography = np.array(json.load(f)["homography"], dtype=np.float64)
+        self.grasp_height = grasp_height
+        self.approach_height = approach_height
+        self.cell_mm = cell_mm
+        self.roll_step = roll_step
+        self.solve_cell = lru_cache(maxsize=cache_size)(self._solve_cell)
+        self.cells = {}  # (cell x, cell y) -> (approach, grasp) joints 1-4, or None if out of reach
+
+    def precompute(self, roi, frame_size, max_cells=20000):
+        """
+        Looks up the approach and grasp joints of every table cell under the pick
+        zone in one batch from the reach grid (armKinematics.ReachGrid), so picks
+        there only add the wrist angle.
+        Args:
+            roi (tuple): Pick zone as (x0, y0, x1, y1) fractions of the frame.
+            frame_size (tuple): (width, height) of the camera frame.
+            max_cells (int): Largest number of cells looked up (a zone mapped to a
+                larger area points to a bad calibration).
+        Returns:
+            int: Number of cells looked up.
+        """
+        if not self.calibrated:
+            return 0
+        x0, y0, x1, y1 = roi
+        width, height = frame_size
+        corners = self.to_arm([(x0 * width, y0 * height), (x1 * width, y0 * height),
+                               (x1 * width, y1 * height), (x0 * width, y1 * height)]) / self.cell_mm
+        low, high = np.floor(corners.min(axis=0)).astype(int), np.ceil(corners.max(axis=0)).astype(int)
+        if np.prod(high - low + 1) > max_cells:
+            print(f"Pick zone covers more than {max_cells} cells, solving picks one by one")
+            return 0
+        cell_x, cell_y = np.meshgrid(np.arange(low[0], high[0] + 1), np.arange(low[1], high[1] + 1), indexing="ij")
+        cell_x, cell_y = cell_x.ravel(), cell_y.ravel()
+        x, y = cell_x * self.cell_mm, cell_y * self.cell_mm
+        grip = np.stack([x, y, np.full(x.shape, float(self.grasp_height))], axis=1)
+        above = grip + (0, 0, self.approach_height)
+        try:
+            joints = armKinematics.ReachGrid().lookup_many(np.concatenate([above, grip]))
+        except OSError as e:
+            print(f"Reach grid not available ({e}), solving picks one by one")
+            return 0
+        approach, grasp = joints[:len(grip)], joints[len(grip):]
+        for i, cell in enumerate(zip(cell_x.tolist(), cell_y.tolist())):
+            if np.isnan(approach[i]).any() or np.isnan(grasp[i]).any():
+                self.cells[cell] = None
+            else:
+                self.cells[cell] = (np.round(approach[i]).astype(int).tolist(), np.round(grasp[i]).astype(int).tolist())
+        return len(grip)
+
+    @property
+    def calibrated(self):
+        return self.homography is not None
+
+    def to_arm(self, points):
+        """
+        Maps frame pixels to table positions in the arm frame.
+        Args:
+            points: N x 2 pixel coordinates.
+        Returns:
+            numpy.ndarray: N x 2 (x, y) positions in millimetres.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 1, 2)
+        return cv2.perspectiveTransform(points, self.homography).reshape(-1, 2)
+
+    def _solve_cell(self, cell_x, cell_y, roll):
+        """
+        Solves the approach and grasp joints at the centre of a table cell.
+        """
+        x, y = cell_x * self.cell_mm, cell_y * self.cell_mm
+        grasp = armKinematics.inverse(x, y, self.grasp_height, roll)
+        approach = armKinematics.inverse(x, y, self.grasp_height + self.approach_height, roll)
+        if grasp is None or approach is None:
+            return None
+        return approach, grasp
+
+    def pick_pose(self, rect):
+        """
+        Joint targets to pick up a product.
+        Args:
+            rect (tuple): The product's ((cx, cy), (w, h), angle) in frame pixels,
+                from product_rect() or detection_rect().
+        Returns:
+            tuple: (approach, grasp) servo angle lists for joints 1-5, or None
+            if the product is out of reach or the camera is not calibrated.
+        """
+        if not self.calibrated:
+            return None
+        (cx, cy), (w, h), angle = rect
+        # The jaws close across the product's short side
+        across = math.radians(angle if w <= h else angle + 90)
+        ends = self.to_arm([(cx, cy), (cx + 10 * math.cos(across), cy + 10 * math.sin(across))])
+        (x, y), (dx, dy) = ends[0], ends[1] - ends[0]
+        # At servo 5 = 90 the jaws close across the arm's reach, so the wrist
+        # turns by the difference between the grip and the reach directions
+        roll = (math.degrees(math.atan2(dy, dx)) - math.degrees(math.atan2(y, x))) % 180
+        roll = int(round(round(roll / self.roll_step) * self.roll_step % 180))
+        cell = int(round(x / self.cell_mm)), int(round(y / self.cell_mm))
+        if cell in self.cells:
+            joints = self.cells[cell]
+            return None if joints is None else tuple(pose + [roll] for pose in joints)
+        return self.solve_cell(*cell, roll)
+
+def calibrate(pairs, path="arm_calibration.json"):
+    """
+    Computes and saves the pixel to arm frame homography.
+    Args:
+        pairs (list): At least four {"pixel": [u, v], "arm": [x, y]} points on the
+            table, spread over the pick zone; "arm" is in millimetres in the arm frame.
+        path (str): File to write.
+    Returns:
+        float: Mean reprojection error in millimetres.
+    """
+    pixels = np.array([pair["pixel"] for pair in pairs], dtype=np.float64)
+    positions = np.array([pair["arm"] for pair in pairs], dtype=np.float64)
+    if len(pairs) < 4:
+        raise ValueError("Calibration needs at least four points")
+    homography, _ = cv2.findHomography(pixels, positions)
+    projected = cv2.perspectiveTransform(pixels.reshape(-1, 1, 2), homography).reshape(-1, 2)
+    error = float(np.linalg.norm(projected - positions, axis=1).mean())
+    with open(path, "w") as f:
+        json.dump({"homography": homography.tolist(), "points": pairs, "error_mm": error}, f, indent=2)
+    return error
+
+def record():
+    """
+    Prints the arm frame position of the gripper tip from the current servo
+    angles: move the tip onto a calibration mark and run this to measure it.
+    """
+    from Arm_Lib import Arm_Device
+    device = Arm_Device()
+    time.sleep(0.1)
+    joints = [device.Arm_serial_servo_read(servo) for servo in range(1, 5)]
+    x, y, z, pitch = armKinematics.forward(joints)
+    print(f"servos {joints}: x {x:.1f} mm, y {y:.1f} mm, z {z:.1f} mm, pitch {pitch:.0f} deg")
+
+def benchmark(picks=1000):
+    """
+    Times picking products scattered around a few resting spots, solving the
+    inverse kinematics each time against the cached cell poses and the cells
+    precomputed from the reach grid.
+    """
+    rng = np.random.default_rng(0)
+    locator = PickLocator(calibration_path=None)
+    # A camera looking straight down at 1 px per 0.5 mm, frame centre 180 mm in front of the base
+    locator.homography = np.array([[0, -0.5, 180 + 120], [-0.5, 0, 160], [0, 0, 1]], dtype=np.float64)
+    spots = rng.uniform((220, 140), (420, 340), (6, 2))
+    rects = [(tuple(spots[i % 6] + rng.normal(0, 2, 2)), (80, 120), float(rng.choice((0, 5, 90)))) for i in range(picks)]
+
+    start = time.perf_counter()
+    for (centre, size, angle) in rects:
+        x, y = locator.to_arm([centre])[0]
+        armKinematics.inverse(x, y, locator.grasp_height)
+        armKinematics.inverse(x, y, locator.grasp_height + locator.approach_height)
+    uncached = (time.perf_counter() - start) / picks
+    start = time.perf_counter()
+    reachable = sum(locator.pick_pose(rect) is not None for rect in rects)
+    cached = (time.perf_counter() - start) / picks
+    info = locator.solve_cell.cache_info()
+    print(f"solve every pick: {uncached * 1e6:.0f} us, cached cells: {cached * 1e6:.0f} us "
+          f"({info.hits} hits, {info.misses} solved), {reachable}/{picks} reachable")
+
+    grid_locator = PickLocator(calibration_path=None)
+    grid_locator.homography = locator.homography
+    start = time.perf_counter()
+    cells = grid_locator.precompute((0.25, 0.25, 0.75, 0.75), (640, 480))
+    setup = time.perf_counter() - start
+    start = time.perf_counter()
+    poses = [grid_locator.pick_pose(rect) for rect in rects]
+    precomputed = (time.perf_counter() - start) / picks
+    solved = [locator.pick_pose(rect) for rect in rects]
+    differences = [abs(a - b) for pose, other in zip(poses, solved) if pose and other
+                   for joints, others in zip(pose, other) for a, b in zip(joints, others)]
+    print(f"precomputed cells: {precomputed * 1e6:.0f} us ({cells} cells in {setup:.2f} s), "
+          f"{sum(pose is not None for pose in poses)}/{picks} reachable, "
+          f"largest servo difference to solving {max(differences, default=0)} deg")
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "calibrate":
+        with open(sys.argv[2]) as f:
+            error = calibrate(json.load(f))
+        print(f"Wrote arm_calibration.json, mean error {error:.1f} mm")
+    elif len(sys.argv) == 2 and sys.argv[1] == "record":
+        record()
+    elif len(sys.argv) == 1:
+        benchmark()
+    else:
+        print("Usage: python3 pickLocator.py [calibrate <points.json> | record]")
+        sys.exit(1)
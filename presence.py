@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+
+import cv2
+import numpy as np
+
+# Presence states reported by PresenceDetector.update
+EMPTY = "empty"
+MOVING = "moving"
+SETTLED = "settled"
+
+def box_iou(a, b):
+    """
+    Intersection over union of two (x, y, w, h) boxes.
+    """
+    x0, y0 = max(a[0], b[0]), max(a[1], b[1])
+    x1, y1 = min(a[0] + a[2], b[0] + b[2]), min(a[1] + a[3], b[1] + b[3])
+    overlap = max(x1 - x0, 0) * max(y1 - y0, 0)
+    union = a[2] * a[3] + b[2] * b[3] - overlap
+    return overlap / union if union else 0.0
+
+class PresenceDetector:
+    """
+    Lightweight check for an item in the pick zone, run on downscaled frames.
+    A MOG2 background model of the empty zone gives an occupancy score; the
+    zone counts as settled once it is occupied and the frame-to-frame motion
+    has stayed low for a few frames, which is when OCR is worth running.
+
+    The background is only learned while the zone is empty, so an item left
+    in place is not absorbed into the background. Start the detector with
+    the zone empty so the warm-up frames learn the bare pick area.
+
+    Each item gets an ID when it settles, so the sorter can decide once per
+    item rather than once per date. An item settling into an empty zone, or
+    after expect_new_item(), is a new item. One settling again after
+    movement keeps its ID if its outline overlaps the last one's (it was
+    nudged) and gets a new one if not (it was swapped without the zone
+    ever emptying).
+    """
+    def __init__(self, roi=(0.0, 0.0, 1.0, 1.0), size=(160, 120), occupancy_threshold=0.08,
+                 motion_threshold=0.02, settle_frames=3, empty_frames=5, warmup_frames=10, same_item_iou=0.6):
+        """
+        Args:
+            roi (tuple): Pick zone as (x0, y0, x1, y1) fractions of the frame.
+            size (tuple): (width, height) the frame is downscaled to.
+            occupancy_threshold (float): Foreground fraction of the zone that means occupied.
+            motion_threshold (float): Changed-pixel fraction between frames that means moving.
+            settle_frames (int): Still, occupied frames needed before reporting settled.
+            empty_frames (int): Unoccupied frames needed before reporting empty again.
+            warmup_frames (int): Frames used to learn the empty background on start.
+            same_item_iou (float): Overlap of the outlines at which an item settling
+                again after movement is taken to be the same item.
+        """
+        self.roi = roi
+        self.size = size
+        self.occupancy_threshold = occupancy_threshold
+        self.motion_threshold = motion_threshold
+        self.settle_frames = settle_frames
+        self.empty_frames = empty_frames
+        self.warmup_frames = warmup_frames
+        self.background = cv2.createBackgroundSubtractorMOG2(history=200, varThreshold=25, detectShadows=False)
+        self.small = np.empty((size[1], size[0], 3), dtype=np.uint8)
+        self.gray = np.empty((size[1], size[0]), dtype=np.uint8)
+        self.previous = None
+        self.seen = 0
+        self.still = 0
+        self.vacant = 0
+        self.state = EMPTY
+        self.occupancy = 0.0
+        self.motion = 0.0
+        self.same_item_iou = same_item_iou
+        self.item = None  # ID of the item in the zone, None while empty
+        self.item_box = None  # Its foreground outline box when it settled
+        self.items_seen = 0
+        self.new_item = False
+
+    def _zone(self, image):
+        """
+        Crops the pick zone out of a downscaled image.
+        """
+        x0, y0, x1, y1 = self.roi
+        width, height = self.size
+        return image[int(y0 * height):int(y1 * height), int(x0 * width):int(x1 * width)]
+
+    def update(self, frame):
+        """
+        Feeds a camera frame into the detector.
+        Args:
+            frame: BGR frame from the camera.
+        Returns:
+            str: EMPTY, MOVING or SETTLED.
+        """
+        cv2.resize(frame, self.size, dst=self.small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self.small, cv2.COLOR_BGR2GRAY, dst=self.gray)
+        self.seen += 1
+
+        # Learn the background while warming up or while the zone is empty
+        learning_rate = -1 if self.seen <= self.warmup_frames or self.state == EMPTY else 0
+        mask = self.background.apply(self.small, learningRate=learning_rate)
+        if self.seen <= self.warmup_frames:
+            self.previous = self.gray.copy()
+            return self.state
+
+        self.occupancy = np.count_nonzero(self._zone(mask)) / self._zone(mask).size
+        changed = cv2.absdiff(self._zone(self.gray), self._zone(self.previous))
+        self.motion = np.count_nonzero(changed > 25) / changed.size
+        np.copyto(self.previous, self.gray)
+
+        if self.occupancy >= self.occupancy_threshold:
+            self.vacant = 0
+            self.still = self.still + 1 if self.motion < self.motion_threshold else 0
+            state = SETTLED if self.still >= self.settle_frames else MOVING
+            if state == SETTLED and self.state != SETTLED:
+                self._identify(self._zone(mask))
+            self.state = state
+        else:
+            self.still = 0
+            self.vacant += 1
+            # Stop reporting settled straight away, but wait a few frames before calling it empty
+            if self.vacant >= self.empty_frames:
+                self.state = EMPTY
+                self.item = self.item_box = None
+            elif self.state == SETTLED:
+                self.state = MOVING
+        return self.state
+
+    def _identify(self, mask):
+        """
+        Gives the item that just settled its ID, new unless it is the previous
+        item moved only slightly.
+        """
+        points = cv2.findNonZero(mask)
+        box = cv2.boundingRect(points) if points is not None else (0, 0, 0, 0)
+        if self.item is None or self.new_item or box_iou(box, self.item_box) < self.same_item_iou:
+            self.items_seen += 1
+            self.item = self.items_seen
+        self.item_box = box
+        self.new_item = False
+
+    def expect_new_item(self):
+        """
+        Makes the next item to settle a new one, e.g. after the arm has taken
+        the last item away. An item that is still there (a failed pick) has to
+        settle again and is then treated as new as well, so it is sorted again.
+        """
+        self.new_item = True
+        if self.state == SETTLED:
+            self.state = MOVING
+            self.still = 0
+
+    def settled(self):
+        """
+        Returns:
+            bool: True while an item is resting in the pick zone.
+        """
+        return self.state == SETTLED
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+import time
+import cv2
+import numpy as np
+from PIL import Image, ImageTk
+
+# Overlay colours (RGB, the preview is drawn after the BGR->RGB conversion)
+DECISION_COLOURS = {"expired": (244, 67, 54), "valid": (76, 175, 80)}
+DEFAULT_COLOUR = (255, 193, 7)
+
+class PreviewRenderer:
+    """
+    Renders the GUI video preview at a fixed, reduced rate and resolution.
+    Frames are downscaled into preallocated buffers and pasted into a single
+    PhotoImage, and the OCR boxes and decision are drawn from the latest
+    pipeline result rather than recomputed for the preview. While a result
+    is shown, the preview holds the frame it was read from, so the boxes
+    line up with the product they were found on.
+    """
+    def __init__(self, label, fps=10, size=(320, 240), overlay_seconds=2.0):
+        """
+        Args:
+            label (tk.Label): Label the preview is shown in.
+            fps (float): Preview refresh rate.
+            size (tuple): (width, height) of the preview.
+            overlay_seconds (float): How long a pipeline result stays drawn.
+        """
+        self.label = label
+        self.interval_ms = max(int(1000 / fps), 1)
+        self.size = size
+        self.overlay_seconds = overlay_seconds
+        self.small = np.empty((size[1], size[0], 3), dtype=np.uint8)
+        self.rgb = np.empty((size[1], size[0], 3), dtype=np.uint8)
+        self.photo = ImageTk.PhotoImage("RGB", size)
+        self.label.configure(image=self.photo)
+        self.result = None
+
+    def set_result(self, result):
+        """
+        Stores the latest pipeline result to overlay (safe to call from any thread).
+        Args:
+            result (dict): 'boxes' (polygons in frame coordinates), 'date', 'decision', 'time',
+                and optionally the 'frame' the result was read from and its full 'shape'.
+        """
+        self.result = result
+
+    def _active_result(self):
+        result = self.result
+        if result is None or time.monotonic() - result["time"] > self.overlay_seconds:
+            return None
+        return result
+
+    def _draw_overlay(self, result, frame_shape):
+        """
+        Draws a result's OCR boxes and decision onto the preview buffer.
+        """
+        colour = DECISION_COLOURS.get(result.get("decision"), DEFAULT_COLOUR)
+        scale = np.array([self.size[0] / frame_shape[1], self.size[1] / frame_shape[0]], dtype=np.float32)
+        for polygon in result.get("boxes", ()):
+            points = (np.asarray(polygon, dtype=np.float32) * scale).astype(np.int32)
+            cv2.polylines(self.rgb, [points], True, colour, 1)
+        caption = " ".join(part for part in (result.get("date"), result.get("decision")) if part)
+        if caption:
+            cv2.putText(self.rgb, caption, (5, 15), cv2.FONT_HERSHEY_SIMPLEX, 0.45, colour, 1)
+
+    def render(self, frame, shape=None):
+        """
+        Shows a camera frame in the preview, or the frame of the result being shown.
+        Args:
+            frame: BGR frame from the camera, possibly already downscaled.
+            shape (tuple): Shape of the full camera frame, if frame is a downscaled copy.
+        """
+        result = self._active_result()
+        if result is not None and result.get("frame") is not None:
+            frame, shape = result["frame"], result["shape"]
+        cv2.resize(frame, self.size, dst=self.small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self.small, cv2.COLOR_BGR2RGB, dst=self.rgb)
+        if result is not None:
+            self._draw_overlay(result, shape or frame.shape)
+        self.photo.paste(Image.fromarray(self.rgb))
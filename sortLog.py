@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+import json
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+# Columns recorded for every OCR attempt, in insertion order
+COLUMNS = ("timestamp", "ocr_text", "parsed_date", "decision", "confidence", "latency")
+
+class SortLog:
+    """
+    Append-only, queryable log of every OCR attempt and sorting decision.
+    Rows are stored in SQLite (WAL mode, so readers never block the writer).
+    record() only puts the row on a queue; a background thread commits the
+    rows in batches, so logging never blocks the vision or arm threads.
+    """
+    def __init__(self, path="sort_log.db", batch_size=50, flush_interval=1.0):
+        """
+        Args:
+            path (str): SQLite database file.
+            batch_size (int): Maximum rows committed in one transaction.
+            flush_interval (float): Longest time (s) a row waits before being committed.
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending = queue.Queue()
+        self.writer_thread = threading.Thread(target=self._writer, daemon=True)
+        self.writer_thread.start()
+
+    def record(self, ocr_text, parsed_date, decision, confidence=None, latency=None):
+        """
+        Queues one entry for the background writer.
+        Args:
+            ocr_text (str): Raw text returned by the OCR stage.
+            parsed_date (datetime): Parsed expiry date, or None.
+            decision (str): e.g. 'expired', 'valid', 'duplicate', 'no_date', 'invalid_date', 'pick_failed'.
+            confidence (float): OCR confidence (0-100) of the date, if known.
+            latency (dict): Seconds spent in each pipeline stage.
+        """
+        self.pending.put((
+            time.time(),
+            ocr_text,
+            parsed_date.strftime("%Y-%m-%d") if parsed_date else None,
+            decision,
+            confidence,
+            json.dumps(latency or {}),
+        ))
+
+    def _connect(self):
+        """
+        Opens a connection to the log database.
+        """
+        connection = sqlite3.connect(self.path, timeout=5)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS sort_log ("
+            "id INTEGER PRIMARY KEY, timestamp REAL, ocr_text TEXT, parsed_date TEXT, "
+            "decision TEXT, confidence REAL, latency TEXT)"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS sort_log_timestamp ON sort_log (timestamp)")
+        return connection
+
+    def _writer(self):
+        """
+        Background thread committing queued rows in batches.
+        """
+        connection = self._connect()
+        insert = f"INSERT INTO sort_log ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+        running = True
+        while running:
+            try:
+                batch = [self.pending.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            # Drain whatever else is already waiting, up to the batch size
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.pending.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                running = False
+                batch = [row for row in batch if row is not None]
+            try:
+                with connection:
+                    connection.executemany(insert, batch)
+            except sqlite3.Error as e:
+                print(f"Sort log write failed: {e}")
+        connection.close()
+
+    def close(self):
+        """
+        Flushes the queued rows and stops the writer thread.
+        """
+        self.pending.put(None)
+        self.writer_thread.join()
+
+    def query(self, sql, params=()):
+        """
+        Runs a read-only query against the log.
+        Args:
+            sql (str): SQL statement.
+            params (tuple): Statement parameters.
+        Returns:
+            list: Result rows.
+        """
+        connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, timeout=5)
+        try:
+            return connection.execute(sql, params).fetchall()
+        finally:
+            connection.close()
+
+    def recent(self, limit=20):
+        """
+        Returns the most recent entries, newest first.
+        """
+        return self.query(f"SELECT {', '.join(COLUMNS)} FROM sort_log ORDER BY id DESC LIMIT ?", (limit,))
+
+    def summary(self, since=0):
+        """
+        Returns the number of entries per decision since a timestamp.
+        """
+        return dict(self.query("SELECT decision, COUNT(*) FROM sort_log WHERE timestamp >= ? GROUP BY decision", (since,)))
+
+def main():
+    """
+    Prints a summary and the latest entries of a sort log.
+    Usage: python3 sortLog.py [sort_log.db] [limit]
+    """
+    path = sys.argv[1] if len(sys.argv) > 1 else "sort_log.db"
+    limit = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    print("Decisions:", dict(connection.execute("SELECT decision, COUNT(*) FROM sort_log GROUP BY decision")))
+    rows = connection.execute(f"SELECT {', '.join(COLUMNS)} FROM sort_log ORDER BY id DESC LIMIT ?", (limit,))
+    for timestamp, ocr_text, parsed_date, decision, confidence, latency in rows:
+        text = " ".join((ocr_text or "").split())[:40]
+        print(f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))}  {decision:<12} "
+              f"{parsed_date or '-':<10}  conf={confidence if confidence is not None else '-'}  {text!r}  {latency}")
+    connection.close()
+
+if __name__ == "__main__":
+    main()
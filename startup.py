@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+
+import importlib
+import threading
+import time
+
+class Subsystem:
+    """
+    A lazily initialised part of the sorter (arm, camera, OCR engine, GUI...).
+    Nothing is imported or initialised until get() is first called, or until
+    warm_up() starts loading it in a background thread so several subsystems
+    can come up in parallel. Import and init times are recorded for the
+    startup profile.
+    """
+    def __init__(self, name, imports=(), init=None, close=None):
+        """
+        Args:
+            name (str): Name shown in the startup profile.
+            imports (list): Modules imported before init runs.
+            init (callable): Called with the imported modules, returns the
+                subsystem's value. Defaults to returning the first module.
+            close (callable): Called with the value to release the subsystem.
+        """
+        self.name = name
+        self.imports = list(imports)
+        self.init = init
+        self._close = close
+        self.value = None
+        self.error = None
+        self.import_seconds = 0.0
+        self.init_seconds = 0.0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        """
+        Imports the modules and runs init, recording how long each took.
+        """
+        importing = True
+        start = time.perf_counter()
+        try:
+            modules = [importlib.import_module(name) for name in self.imports]
+            self.import_seconds = time.perf_counter() - start
+
+            importing = False
+            start = time.perf_counter()
+            if self.init is not None:
+                self.value = self.init(*modules)
+            elif modules:
+                self.value = modules[0]
+            self.init_seconds = time.perf_counter() - start
+        except Exception as e:
+            self.error = e
+            # Charge the time spent before the failure to the phase that failed
+            if importing:
+                self.import_seconds = time.perf_counter() - start
+            else:
+                self.init_seconds = time.perf_counter() - start
+
+    def warm_up(self):
+        """
+        Starts loading the subsystem in the background (no-op if already started).
+        """
+        with self._lock:
+            if self._thread is None:
+                self.error = None
+                self.import_seconds = self.init_seconds = 0.0
+                self._thread = threading.Thread(target=self._load, name=f"warm-up-{self.name}", daemon=True)
+                self._thread.start()
+
+    def get(self):
+        """
+        Returns the subsystem's value, loading it first if needed.
+        Raises:
+            Exception: Whatever the import or init raised.
+        """
+        self.warm_up()
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+    def ready(self):
+        """
+        Returns:
+            bool: True once loading has finished (successfully or not).
+        """
+        return self._thread is not None and not self._thread.is_alive()
+
+    def close(self):
+        """
+        Releases the subsystem; the next get() initialises it again.
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        thread.join()
+        if self._close is not None and self.value is not None:
+            self._close(self.value)
+        self.value = None
+
+def warm_up(subsystems):
+    """
+    Starts loading all the given subsystems in parallel.
+    """
+    for subsystem in subsystems:
+        subsystem.warm_up()
+
+def report(subsystems, wall_seconds):
+    """
+    Formats the startup profile of the given subsystems.
+    Args:
+        subsystems (list): Subsystems that were loaded.
+        wall_seconds (float): Wall-clock time until everything was ready.
+    Returns:
+        str: One line per subsystem plus the serial and parallel totals.
+    """
+    lines = [f"{'subsystem':<10} {'import':>9} {'init':>9} {'total':>9}"]
+    serial = 0.0
+    for subsystem in subsystems:
+        total = subsystem.import_seconds + subsystem.init_seconds
+        serial += total
+        status = f"  FAILED: {subsystem.error}" if subsystem.error else ""
+        lines.append(f"{subsystem.name:<10} {subsystem.import_seconds:>8.3f}s {subsystem.init_seconds:>8.3f}s {total:>8.3f}s{status}")
+    lines.append(f"{'serial':<10} {serial:>28.3f}s")
+    lines.append(f"{'parallel':<10} {wall_seconds:>28.3f}s")
+    return "\n".join(lines)
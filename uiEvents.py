@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+import queue
+import threading
+
+class Subscription:
+    """
+    One front-end's view of the event bus: a bounded queue it drains on its own thread.
+    """
+    def __init__(self, maxsize):
+        self.events = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def drain(self, max_events=100):
+        """
+        Takes the pending events without blocking.
+        Args:
+            max_events (int): Largest batch returned by one call.
+        Returns:
+            list: Events in the order they were posted.
+        """
+        batch = []
+        while len(batch) < max_events:
+            try:
+                batch.append(self.events.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+class EventBus:
+    """
+    Fan-out of pipeline events from the worker threads to the front-ends.
+    Workers only post() events and never touch Tk (or any other UI) objects;
+    each front-end subscribes and drains its queue from its own thread,
+    e.g. the Tk main loop on a root.after timer.
+
+    Events are dicts with a 'type' key, e.g.
+        {"type": "result", "decision": "valid", "date": "12/05/2025", "boxes": [...], "time": ...}
+    """
+    def __init__(self):
+        self.subscriptions = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, maxsize=256):
+        """
+        Registers a new front-end.
+        Args:
+            maxsize (int): Events kept for a slow subscriber before the oldest are dropped.
+        Returns:
+            Subscription: Queue to drain.
+        """
+        subscription = Subscription(maxsize)
+        with self._lock:
+            self.subscriptions = self.subscriptions + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self.subscriptions = [s for s in self.subscriptions if s is not subscription]
+
+    def post(self, event):
+        """
+        Delivers an event to every subscriber without ever blocking the caller.
+        A subscriber that has fallen behind loses its oldest event.
+        """
+        for subscription in self.subscriptions:
+            while True:
+                try:
+                    subscription.events.put_nowait(event)
+                    break
+                except queue.Full:
+                    try:
+                        subscription.events.get_nowait()
+                        subscription.dropped += 1
+                    except queue.Empty:
+                        pass
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+
+import sys
+import time
+import cv2
+import numpy as np
+
+def decode_predictions(outputs, frame_shape, confidence_threshold=0.5, nms_threshold=0.4,
+                       objectness=False, num_classes=None):
+    """
+    Turns raw YOLO outputs into final detections in one pass over the whole
+    output array (no per-row Python loop), followed by class-aware
+    non-maximum suppression so each object is reported once.
+    Args:
+        outputs (list): Output arrays whose last dimension holds rows of
+            (cx, cy, w, h, objectness, class scores...) relative to the input,
+            e.g. the cv2.dnn output layers or a Keras YOLO grid.
+        frame_shape (tuple): Shape of the frame the boxes are scaled to.
+        confidence_threshold (float): Smallest confidence kept.
+        nms_threshold (float): IoU above which the weaker of two same-class boxes is dropped.
+        objectness (bool): Multiply the class scores by the objectness column
+            (Keras YOLO heads); cv2.dnn Darknet outputs already include it.
+        num_classes (int): Class count, for outputs packing several anchors per
+            grid cell in the last dimension; defaults to a single anchor per row.
+    Returns:
+        tuple: (boxes N x 4 int array of x, y, w, h in frame pixels,
+        confidences N float array, class_ids N int array), strongest first.
+    """
+    rows = [np.asarray(output, dtype=np.float32) for output in outputs]
+    width = 5 + num_classes if num_classes else rows[0].shape[-1]
+    rows = np.concatenate([output.reshape(-1, width) for output in rows])
+
+    scores = rows[:, 5:]
+    if objectness:
+        scores = scores * rows[:, 4:5]
+    class_ids = scores.argmax(axis=1)
+    confidences = scores[np.arange(len(rows)), class_ids]
+    keep = confidences > confidence_threshold
+    rows, class_ids, confidences = rows[keep], class_ids[keep], confidences[keep]
+    if not len(rows):
+        return np.empty((0, 4), int), np.empty(0, np.float32), np.empty(0, int)
+
+    height, frame_width = frame_shape[:2]
+    sizes = rows[:, 2:4] * (frame_width, height)
+    corners = rows[:, 0:2] * (frame_width, height) - sizes / 2
+    boxes = np.hstack([corners, sizes]).astype(int)
+
+    # Shifting each class to its own region of the plane makes NMSBoxes class
+    # aware (a box never suppresses one of another class) on any OpenCV version
+    offset = class_ids[:, None] * (max(frame_width, height) + 1)
+    shifted = boxes.copy()
+    shifted[:, :2] += offset
+    indices = np.asarray(cv2.dnn.NMSBoxes(shifted.tolist(), confidences.tolist(), confidence_threshold, nms_threshold), dtype=int).reshape(-1)
+    indices = indices[np.argsort(-confidences[indices])]
+    return boxes[indices], confidences[indices], class_ids[indices]
+
+def as_dicts(detections, labels):
+    """
+    Converts decoded detections to one dict per object.
+    Args:
+        detections (tuple): Result of decode_predictions().
+        labels (list): Class names by class id.
+    Returns:
+        list: Dicts with 'label', 'class_id', 'confidence', 'x', 'y', 'width' and 'height'.
+    """
+    boxes, confidences, class_ids = detections
+    return [{
+        "label": labels[class_id], "class_id": int(class_id), "confidence": float(confidence),
+        "x": int(x), "y": int(y), "width": int(w), "height": int(h),
+    } for (x, y, w, h), confidence, class_id in zip(boxes, confidences, class_ids)]
+
+class YOLODetector:
+    """
+    YOLO object detection on OpenCV's dnn module, set up for repeated calls:
+    the output layer names are resolved once, and frames are resized and
+    normalised into an input buffer that is reused while the batch size and
+    input size stay the same. A smaller input size (320) trades accuracy
+    for speed on the CPU; a larger one (608) finds smaller objects.
+    """
+    INPUT_SIZES = (320, 416, 608)
+
+    def __init__(self, config_path, weights_path, names_path, input_size=416,
+                 confidence_threshold=0.5, nms_threshold=0.4, objectness=False):
+        """
+        Args:
+            config_path (str): Darknet .cfg file, or None for a single-file model (.onnx).
+            weights_path (str): Darknet .weights (or .onnx) file.
+            names_path (str): Class names, one per line.
+            input_size (int): Network input side in pixels, a multiple of 32 (320, 416 or 608 for YOLOv4).
+            confidence_threshold (float): Smallest confidence kept.
+            nms_threshold (float): IoU above which overlapping same-class boxes are merged.
+            objectness (bool): Multiply class scores by objectness (exports that output them separately).
+        """
+        self.net = cv2.dnn.readNet(weights_path, config_path or "")
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        self.output_layers = self.net.getUnconnectedOutLayersNames()
+        with open(names_path, 'r') as f:
+            self.labels = f.read().strip().split('\n')
+        self.confidence_threshold = confidence_threshold
+        self.nms_threshold = nms_threshold
+        self.objectness = objectness
+        self.blob = None
+        self.set_input_size(input_size)
+
+    def set_input_size(self, input_size):
+        """
+        Changes the network input size; the buffers are reallocated on the next call.
+        Args:
+            input_size (int): Input side in pixels, a multiple of 32.
+        """
+        if input_size % 32:
+            raise ValueError(f"YOLO input size must be a multiple of 32, got {input_size}")
+        self.input_size = input_size
+        self.resized = np.empty((input_size, input_size, 3), np.uint8)
+        self.rgb = np.empty_like(self.resized)
+        self.blob = None
+
+    def _prepare(self, frames):
+        """
+        Fills the reused N x 3 x size x size input buffer with the frames,
+        RGB and scaled to 0-1 (what blobFromImage does, without new arrays per frame).
+        """
+        size = self.input_size
+        if self.blob is None or len(self.blob) != len(frames):
+            self.blob = np.empty((len(frames), 3, size, size), np.float32)
+        for index, frame in enumerate(frames):
+            cv2.resize(frame, (size, size), dst=self.resized)
+            cv2.cvtColor(self.resized, cv2.COLOR_BGR2RGB, dst=self.rgb)
+            np.multiply(self.rgb.transpose(2, 0, 1), np.float32(1 / 255), out=self.blob[index])
+        return self.blob
+
+    def detect_many(self, frames):
+        """
+        Detects objects in several frames with one forward pass.
+        Args:
+            frames (list): BGR frames (they may differ in size).
+        Returns:
+            list: For each frame, a list of detection dicts as from as_dicts().
+        """
+        if not len(frames):
+            return []
+        self.net.setInput(self._prepare(frames))
+        outputs = [np.asarray(output) for output in self.net.forward(self.output_layers)]
+        results = []
+        for index, frame in enumerate(frames):
+            # Batched outputs have the frame as first dimension; Darknet region
+            # layers may instead stack the frames' rows in one 2D array
+            rows = [output[index] if output.ndim == 3 else np.split(output, len(frames))[index] for output in outputs]
+            detections = decode_predictions(rows, frame.shape, self.confidence_threshold,
+                                            self.nms_threshold, self.objectness)
+            results.append(as_dicts(detections, self.labels))
+        return results
+
+    def detect(self, frame):
+        """
+        Detects objects in one frame.
+        Args:
+            frame: BGR frame.
+        Returns:
+            list: Detection dicts with 'label', 'class_id', 'confidence', 'x', 'y', 'width' and 'height'.
+        """
+        return self.detect_many([frame])[0]
+
+def benchmark_detector(config_path, weights_path, names_path, frame_count=8, runs=5):
+    """
+    Compares detection throughput at each input size, one frame per forward
+    pass against detect_many() over frame_count frames.
+    """
+    frames = [np.random.default_rng(index).integers(0, 256, (480, 640, 3), dtype=np.uint8) for index in range(frame_count)]
+    for size in YOLODetector.INPUT_SIZES:
+        detector = YOLODetector(config_path, weights_path, names_path, input_size=size)
+        detector.detect(frames[0])  # Warm up
+        start = time.perf_counter()
+        for _ in range(runs):
+            for frame in frames:
+                detector.detect(frame)
+        single = (time.perf_counter() - start) / (runs * frame_count)
+        detector.detect_many(frames)
+        start = time.perf_counter()
+        for _ in range(runs):
+            detector.detect_many(frames)
+        batched = (time.perf_counter() - start) / (runs * frame_count)
+        print(f"{size}x{size}: detect {1 / single:.1f} fps, detect_many({frame_count}) {1 / batched:.1f} fps")
+
+def _decode_loop(outputs, frame_shape, confidence_threshold=0.5):
+    """
+    The original per-row decoding of robotarm 1.py, kept for the benchmark.
+    """
+    h, w = frame_shape[:2]
+    detections = []
+    for output in outputs:
+        for detection in output:
+            scores = detection[5:]
+            class_id = np.argmax(scores)
+            confidence = scores[class_id]
+            if confidence > confidence_threshold:
+                box = detection[0:4] * np.array([w, h, w, h])
+                (center_x, center_y, width, height) = box.astype("int")
+                detections.append((int(center_x - width / 2), int(center_y - height / 2), int(width), int(height), class_id))
+    return detections
+
+def benchmark(classes=80, objects=5, runs=20):
+    """
+    Times the per-row loop against decode_predictions on synthetic YOLOv4-sized
+    outputs (three 416x416 heads) with a cluster of overlapping boxes per object.
+    """
+    rng = np.random.default_rng(0)
+    outputs = []
+    for grid in (13, 26, 52):
+        output = rng.random((grid * grid * 3, 5 + classes), dtype=np.float32) * 0.3
+        outputs.append(output)
+    # Each object is found by several neighbouring cells, as YOLO does
+    for index in range(objects):
+        rows = outputs[2][index * 400:index * 400 + 6]
+        rows[:, :4] = (0.15 + index * 0.15, 0.5, 0.1, 0.2)
+        rows[:, :4] += rng.normal(0, 0.005, (6, 4))
+        rows[:, 5 + index] = rng.uniform(0.7, 0.95, 6)
+    frame_shape = (480, 640, 3)
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        looped = _decode_loop(outputs, frame_shape)
+    loop_seconds = (time.perf_counter() - start) / runs
+    start = time.perf_counter()
+    for _ in range(runs):
+        boxes, _, _ = decode_predictions(outputs, frame_shape)
+    vector_seconds = (time.perf_counter() - start) / runs
+    print(f"loop:       {loop_seconds * 1000:.2f} ms, {len(looped)} boxes (no NMS)")
+    print(f"vectorised: {vector_seconds * 1000:.2f} ms, {len(boxes)} boxes after NMS")
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4:
+        benchmark_detector(*sys.argv[1:])
+    else:
+        print("Usage: python3 yoloDetector.py <yolov4.cfg> <yolov4.weights> <coco.names> to time the input sizes;")
+        print("without arguments, times the output decoding.")
+        benchmark()